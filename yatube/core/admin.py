@@ -1,11 +1,53 @@
-from django.contrib import admin
+import os
+import subprocess
+import sys
 
+from django.conf import settings
+from django.contrib import admin, messages
+
+from core.utility.censorship import (acquire_recensor_lock,
+                                     release_recensor_lock)
 from .models import ObsceneWord
 
 
+def recensor_texts(modeladmin, request, queryset):
+    """
+    Start the `recensor` command in a background process, handing it
+    the run lock taken here, unless a run is already in progress.
+
+    """
+    token = acquire_recensor_lock()
+    if token is None:
+        modeladmin.message_user(
+            request,
+            'Перецензурирование уже выполняется, дождитесь его окончания.',
+            messages.WARNING,
+        )
+        return
+    try:
+        subprocess.Popen(
+            [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'),
+             'recensor', '--lock-token', token],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+    except OSError:
+        release_recensor_lock(token)
+        raise
+    modeladmin.message_user(
+        request,
+        'Перецензурирование постов и комментариев запущено в фоне.',
+    )
+
+
+recensor_texts.short_description = 'Перецензурировать посты и комментарии'
+
+
 class ObseneWordAdmin(admin.ModelAdmin):
     list_display = ('word',)
     search_fields = ('word',)
+    actions = (recensor_texts,)
 
 
 admin.site.register(ObsceneWord, ObseneWordAdmin)
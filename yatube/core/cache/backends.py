@@ -0,0 +1,280 @@
+import threading
+import time
+from typing import Optional
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .serializer import Serializer
+from .stores import LRUStore, SQLiteStore
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Stores are shared by the backend instances of the threads,
+# keyed by the cache location like LocMemCache does.
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def make_serializer(options: dict) -> Serializer:
+    """Return the serializer configured by the cache OPTIONS."""
+    return Serializer(
+        min_bytes=options.get('COMPRESS_MIN_BYTES', 1024),
+        level=options.get('COMPRESS_LEVEL', 6),
+    )
+
+
+class SizeAwareLRUCache(BaseCache):
+    """
+    Per-process memory cache evicting the least recently used entries
+    once their serialized size exceeds OPTIONS['MAX_BYTES']::
+
+        CACHES = {
+            'default': {
+                'BACKEND': 'core.cache.backends.SizeAwareLRUCache',
+                'OPTIONS': {'MAX_BYTES': 64 * 1024 * 1024},
+            }
+        }
+
+    Values of at least OPTIONS['COMPRESS_MIN_BYTES'] (1024) bytes are
+    compressed with zlib at OPTIONS['COMPRESS_LEVEL'] (6), so the size
+    counted against the budget is the compressed one.
+    The hits, misses and evictions are reported by stats().
+
+    """
+    def __init__(self, name, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.serializer = make_serializer(options)
+        with _stores_lock:
+            if name not in _stores:
+                _stores[name] = LRUStore(
+                    options.get('MAX_BYTES', DEFAULT_MAX_BYTES)
+                )
+            self._store = _stores[name]
+
+    def _key(self, key, version=None) -> str:
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _expires(self, timeout) -> Optional[float]:
+        return self.get_backend_timeout(timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._store.add(
+            self._key(key, version),
+            self.serializer.dumps(value),
+            self._expires(timeout),
+        )
+
+    def get(self, key, default=None, version=None):
+        data = self._store.get(self._key(key, version))
+        if data is None:
+            return default
+        return self.serializer.loads(data)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._store.set(
+            self._key(key, version),
+            self.serializer.dumps(value),
+            self._expires(timeout),
+        )
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._store.touch(
+            self._key(key, version), self._expires(timeout),
+        )
+
+    def delete(self, key, version=None):
+        self._store.delete(self._key(key, version))
+
+    def has_key(self, key, version=None):
+        return self._store.has(self._key(key, version))
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        with self._store.lock:
+            entry = self._store.get_entry(key)
+            if entry is None:
+                raise ValueError(f"Key '{key}' not found")
+            data, expires, _ = entry
+            value = self.serializer.loads(data) + delta
+            self._store.set(key, self.serializer.dumps(value), expires)
+        return value
+
+    def clear(self):
+        self._store.clear()
+
+    def stats(self) -> dict:
+        """Return the hits, misses, evictions and size of the cache."""
+        return self._store.stats()
+
+
+class TieredCache(BaseCache):
+    """
+    Cache shared by the processes of a host through an SQLite file (L2)
+    with a small LRU copy of the recently used entries in every
+    process (L1)::
+
+        CACHES = {
+            'default': {
+                'BACKEND': 'core.cache.backends.TieredCache',
+                'LOCATION': '/path/to/cache.sqlite3',
+                'OPTIONS': {
+                    'L1_MAX_BYTES': 16 * 1024 * 1024,
+                    'L1_CHECK_INTERVAL': 0,
+                    'MAX_ENTRIES': 100000,
+                    'COMPRESS_MIN_BYTES': 1024,
+                },
+            }
+        }
+
+    Writes go to L2 first. An L1 copy is served only while its stamp
+    matches the L2 one; the stamps are compared on every read, or once
+    per L1_CHECK_INTERVAL seconds, so the processes see the writes
+    of each other. Both tiers keep the values compressed like
+    :class:`SizeAwareLRUCache` does.
+
+    """
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.serializer = make_serializer(options)
+        self.check_interval = options.get('L1_CHECK_INTERVAL', 0)
+        with _stores_lock:
+            if location not in _stores:
+                _stores[location] = (
+                    LRUStore(options.get('L1_MAX_BYTES', DEFAULT_MAX_BYTES)),
+                    SQLiteStore(
+                        location,
+                        max_entries=options.get('MAX_ENTRIES', 100000),
+                    ),
+                )
+            self._l1, self._l2 = _stores[location]
+        self.hits = self.misses = 0
+
+    def _key(self, key, version=None) -> str:
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _keep(self, key: str, data: bytes, expires, stamp: int) -> None:
+        """Keep a copy of an L2 entry in L1."""
+        self._l1.set(key, data, expires, meta=(stamp, time.time()))
+
+    def _get_many(self, keys) -> dict:
+        """Return the data of the live entries, preferring L1 copies."""
+        found, unchecked, missing = {}, {}, []
+        now = time.time()
+        for key in keys:
+            entry = self._l1.use_entry(key)
+            if entry is None:
+                missing.append(key)
+                continue
+            data, _, (stamp, checked) = entry
+            if now - checked < self.check_interval:
+                found[key] = data
+            else:
+                unchecked[key] = (data, stamp)
+
+        stamps = self._l2.stamps(unchecked) if unchecked else {}
+        for key, (data, stamp) in unchecked.items():
+            if stamps.get(key) == stamp:
+                self._l1.update_meta(key, (stamp, now))
+                found[key] = data
+            else:
+                self._l1.discard(key)
+                missing.append(key)
+
+        if missing:
+            for key, (data, expires, stamp) in self._l2.get_many(
+                missing
+            ).items():
+                self._keep(key, data, expires, stamp)
+                found[key] = data
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        data = self._get_many([key]).get(key)
+        if data is None:
+            return default
+        return self.serializer.loads(data)
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        return {
+            keys[key]: self.serializer.loads(data)
+            for key, data in self._get_many(list(keys)).items()
+        }
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return key in self._get_many([key])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        items = {
+            self._key(key, version): self.serializer.dumps(value)
+            for key, value in data.items()
+        }
+        stamps = self._l2.set_many(
+            (key, value, expires) for key, value in items.items()
+        )
+        for key, value in items.items():
+            self._keep(key, value, expires, stamps[key])
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        data = self.serializer.dumps(value)
+        expires = self.get_backend_timeout(timeout)
+        stamp = self._l2.add(key, data, expires)
+        if stamp is None:
+            return False
+        self._keep(key, data, expires, stamp)
+        return True
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        try:
+            value, data, expires, stamp = self._l2.incr(
+                key, delta, self.serializer.loads, self.serializer.dumps,
+            )
+        except ValueError:
+            self._l1.delete(key)
+            raise
+        self._keep(key, data, expires, stamp)
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expires = self.get_backend_timeout(timeout)
+        self._l1.touch(key, expires)
+        return self._l2.touch(key, expires)
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        self._l1.delete(key)
+        self._l2.delete(key)
+
+    def clear(self):
+        self._l1.clear()
+        self._l2.clear()
+
+    def stats(self) -> dict:
+        """
+        Return the hits and misses of this backend instance and
+        the usage counters of the L1 store of the process.
+
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'l1': self._l1.stats(),
+        }
@@ -0,0 +1,37 @@
+import pickle
+import zlib
+from typing import Any
+
+PLAIN = b'p'
+COMPRESSED = b'z'
+
+
+class Serializer:
+    """
+    Serialize cache values to the bytes kept by the stores, compressing
+    with zlib the ones of at least min_bytes that compress well (such as
+    rendered pages).
+
+    The first byte tells whether the data is compressed; data written
+    before the marker was introduced is read as a plain pickle.
+
+    """
+    def __init__(self, min_bytes: int = 1024, level: int = 6):
+        self.min_bytes = min_bytes
+        self.level = level
+
+    def dumps(self, value: Any) -> bytes:
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(data) >= self.min_bytes:
+            compressed = zlib.compress(data, self.level)
+            if len(compressed) < len(data):
+                return COMPRESSED + compressed
+        return PLAIN + data
+
+    def loads(self, data: bytes) -> Any:
+        marker = data[:1]
+        if marker == COMPRESSED:
+            return pickle.loads(zlib.decompress(data[1:]))
+        if marker == PLAIN:
+            return pickle.loads(data[1:])
+        return pickle.loads(data)
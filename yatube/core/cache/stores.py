@@ -0,0 +1,318 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class LRUStore:
+    """
+    In-memory store of serialized cache entries under a byte budget.
+
+    Entries are kept in the order of use and the least recently used
+    ones are evicted when the budget is exceeded; an entry larger than
+    the whole budget is not stored. The size of an entry is the length
+    of its key and of its data. Expiry times are absolute timestamps
+    or None for entries that never expire. An entry may carry metadata
+    of its owner, such as the stamp of the entry in another store.
+
+    """
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.lock = threading.RLock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def entry_size(key: str, data: bytes) -> int:
+        return len(key) + len(data)
+
+    def _expired(self, expires: Optional[float]) -> bool:
+        return expires is not None and expires <= time.time()
+
+    def get_entry(self, key: str):
+        """
+        Return the data, the expiry and the metadata of the entry
+        without counting the use.
+
+        """
+        entry = self._entries.get(key)
+        if entry is not None and self._expired(entry[1]):
+            self._delete(key)
+            entry = None
+        return entry
+
+    def use_entry(self, key: str):
+        """
+        Return the data, the expiry and the metadata of the entry,
+        counting the use and marking the entry as recently used.
+
+        """
+        with self.lock:
+            entry = self.get_entry(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self.use_entry(key)
+        return None if entry is None else entry[0]
+
+    def has(self, key: str) -> bool:
+        with self.lock:
+            return self.get_entry(key) is not None
+
+    def set(self, key: str, data: bytes, expires: Optional[float],
+            meta=None) -> None:
+        with self.lock:
+            self._delete(key)
+            size = self.entry_size(key, data)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (data, expires, meta)
+            self._bytes += size
+            self._evict()
+
+    def add(self, key: str, data: bytes, expires: Optional[float]) -> bool:
+        with self.lock:
+            if self.get_entry(key) is not None:
+                return False
+            self.set(key, data, expires)
+            return True
+
+    def touch(self, key: str, expires: Optional[float]) -> bool:
+        with self.lock:
+            entry = self.get_entry(key)
+            if entry is None:
+                return False
+            self._entries[key] = (entry[0], expires, entry[2])
+            return True
+
+    def update_meta(self, key: str, meta) -> None:
+        with self.lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (entry[0], entry[1], meta)
+
+    def _delete(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= self.entry_size(key, entry[0])
+        return True
+
+    def delete(self, key: str) -> bool:
+        with self.lock:
+            return self._delete(key)
+
+    def discard(self, key: str) -> None:
+        """Delete an entry found out of date, counting its use as a miss."""
+        with self.lock:
+            if self._delete(key):
+                self.hits -= 1
+                self.misses += 1
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes:
+            key, (data, *_) = self._entries.popitem(last=False)
+            self._bytes -= self.entry_size(key, data)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self.lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Return the usage counters of the store."""
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+
+class SQLiteStore:
+    """
+    Store of serialized cache entries in an SQLite file shared by
+    the processes of a host.
+
+    Every write gives the entry a new random stamp, so that the
+    processes can tell whether their copies of an entry are current
+    by reading the stamps only. Expired entries are purged now and then;
+    beyond max_entries the entries expiring first are culled.
+
+    """
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS cache_entries ('
+        'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+        'expires REAL, stamp INTEGER NOT NULL)',
+        'CREATE INDEX IF NOT EXISTS cache_entries_expires '
+        'ON cache_entries (expires)',
+    )
+    ALIVE = '(expires IS NULL OR expires > ?)'
+    BATCH_SIZE = 500
+    PURGE_EVERY = 100
+
+    def __init__(self, path: str, max_entries: int = 100000,
+                 timeout: float = 5.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._local = threading.local()
+        self._writes = 0
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Return the connection of the current thread and process."""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(
+                self.path, timeout=self.timeout, isolation_level=None,
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in self.SCHEMA:
+                connection.execute(statement)
+            local.connection = connection
+            local.pid = os.getpid()
+        return local.connection
+
+    @staticmethod
+    def new_stamp() -> int:
+        return random.getrandbits(63)
+
+    def _batches(self, keys):
+        keys = list(keys)
+        for start in range(0, len(keys), self.BATCH_SIZE):
+            batch = keys[start:start + self.BATCH_SIZE]
+            yield batch, ','.join('?' * len(batch))
+
+    def stamps(self, keys) -> dict:
+        """Return the stamps of the live entries among the keys."""
+        stamps = {}
+        for batch, marks in self._batches(keys):
+            stamps.update(self.connection.execute(
+                f'SELECT key, stamp FROM cache_entries '
+                f'WHERE key IN ({marks}) AND {self.ALIVE}',
+                [*batch, time.time()],
+            ))
+        return stamps
+
+    def get_many(self, keys) -> dict:
+        """Return the data, expiry and stamp of the live entries."""
+        entries = {}
+        for batch, marks in self._batches(keys):
+            for key, data, expires, stamp in self.connection.execute(
+                f'SELECT key, value, expires, stamp FROM cache_entries '
+                f'WHERE key IN ({marks}) AND {self.ALIVE}',
+                [*batch, time.time()],
+            ):
+                entries[key] = (data, expires, stamp)
+        return entries
+
+    def set_many(self, items) -> dict:
+        """Store (key, data, expires) items; return their stamps."""
+        rows = [
+            (key, data, expires, self.new_stamp())
+            for key, data, expires in items
+        ]
+        with self.connection as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.executemany(
+                'INSERT OR REPLACE INTO cache_entries '
+                '(key, value, expires, stamp) VALUES (?, ?, ?, ?)',
+                rows,
+            )
+        self._written(len(rows))
+        return {key: stamp for key, _, _, stamp in rows}
+
+    def add(self, key: str, data: bytes,
+            expires: Optional[float]) -> Optional[int]:
+        """Store the entry unless a live one exists; return its stamp."""
+        stamp = self.new_stamp()
+        cursor = self.connection.execute(
+            'INSERT INTO cache_entries (key, value, expires, stamp) '
+            'VALUES (?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+            'value = excluded.value, expires = excluded.expires, '
+            'stamp = excluded.stamp '
+            'WHERE cache_entries.expires IS NOT NULL '
+            'AND cache_entries.expires <= ?',
+            (key, data, expires, stamp, time.time()),
+        )
+        if cursor.rowcount != 1:
+            return None
+        self._written(1)
+        return stamp
+
+    def incr(self, key: str, delta: int, loads, dumps):
+        """
+        Add delta to the value of a live entry in a single transaction;
+        return the new value, its data, expiry and stamp.
+
+        """
+        with self.connection as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            row = connection.execute(
+                f'SELECT value, expires FROM cache_entries '
+                f'WHERE key = ? AND {self.ALIVE}',
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = loads(row[0]) + delta
+            data, stamp = dumps(value), self.new_stamp()
+            connection.execute(
+                'UPDATE cache_entries SET value = ?, stamp = ? WHERE key = ?',
+                (data, stamp, key),
+            )
+        return value, data, row[1], stamp
+
+    def touch(self, key: str, expires: Optional[float]) -> bool:
+        cursor = self.connection.execute(
+            f'UPDATE cache_entries SET expires = ? '
+            f'WHERE key = ? AND {self.ALIVE}',
+            (expires, key, time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key: str) -> bool:
+        cursor = self.connection.execute(
+            'DELETE FROM cache_entries WHERE key = ?', (key,),
+        )
+        return cursor.rowcount == 1
+
+    def clear(self) -> None:
+        self.connection.execute('DELETE FROM cache_entries')
+
+    def _written(self, count: int) -> None:
+        self._writes += count
+        if self._writes >= self.PURGE_EVERY:
+            self._writes = 0
+            self.purge()
+
+    def purge(self) -> None:
+        """Delete the expired entries and cull the ones over the limit."""
+        connection = self.connection
+        connection.execute(
+            'DELETE FROM cache_entries WHERE expires <= ?', (time.time(),),
+        )
+        connection.execute(
+            'DELETE FROM cache_entries WHERE key IN ('
+            'SELECT key FROM cache_entries '
+            'ORDER BY expires IS NULL, expires LIMIT max(0, '
+            '(SELECT count(*) FROM cache_entries) - ?))',
+            (self.max_entries,),
+        )
@@ -0,0 +1,90 @@
+import random
+import threading
+from functools import wraps
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Set on the responses of the writing views: the user reads from the
+# primary until the replicas have caught up with the write.
+PIN_COOKIE = 'pin_primary'
+# Sessions are written on every login and must never be read stale.
+PRIMARY_ONLY_APPS = {'sessions'}
+
+_state = threading.local()
+
+
+def current_replica() -> Optional[str]:
+    """Return the replica chosen for the current view, if any."""
+    return getattr(_state, 'replica', None)
+
+
+def replica_reads(view: Callable) -> Callable:
+    """
+    Send the reads of a read-only view to one of the
+    settings.REPLICA_DATABASES, unless the user has just written.
+
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not settings.REPLICA_DATABASES or PIN_COOKIE in request.COOKIES:
+            return view(request, *args, **kwargs)
+        # Load the user from the primary: a new account may not have
+        # reached the replicas yet.
+        user = getattr(request, 'user', None)
+        if user is not None:
+            user.is_authenticated
+        _state.replica = random.choice(settings.REPLICA_DATABASES)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _state.replica = None
+    return wrapper
+
+
+def pin_primary(view: Callable) -> Callable:
+    """
+    Make the user of a writing view read from the primary for
+    settings.REPLICA_PIN_SECONDS, so that the write is seen at once.
+
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if settings.REPLICA_DATABASES:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+    return wrapper
+
+
+class ReplicaRouter:
+    """
+    Route the reads of the views marked with :func:`replica_reads`
+    to a replica; everything else, and every write, to the primary.
+
+    The replicas are copies of the primary kept in sync by the
+    `sync_replicas` command: only the primary is migrated.
+
+    """
+    def db_for_read(self, model, **hints) -> Optional[str]:
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return DEFAULT_DB_ALIAS
+        return current_replica() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints) -> str:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None,
+                      **hints) -> Optional[bool]:
+        if db != DEFAULT_DB_ALIAS:
+            return False
+        return None
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    SQLite backend tuned for several worker processes writing at once.
+
+    New connections get the settings.SQLITE_PRAGMAS (WAL journal,
+    busy timeout...). Transactions are started with BEGIN IMMEDIATE:
+    a deferred transaction reading before it writes cannot wait for
+    the write lock and fails with "database is locked" instead.
+
+    """
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
@@ -0,0 +1,47 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.utility.cache import REPLICA_SCOPE, bump_generations
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the default database to the replicas listed in '
+        'settings.REPLICA_DATABASES with the SQLite backup API.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Copy again every that many seconds instead of once.',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.REPLICA_DATABASES:
+            self.stdout.write('No replica databases are configured.')
+            return
+        while True:
+            self.sync()
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def sync(self) -> None:
+        """
+        Copy the primary to every replica, then expire the cached pages
+        that may have been rendered from the previous copies.
+
+        """
+        primary = connections[DEFAULT_DB_ALIAS]
+        primary.ensure_connection()
+        for alias in settings.REPLICA_DATABASES:
+            replica = connections[alias]
+            replica.ensure_connection()
+            primary.connection.backup(replica.connection)
+            self.stdout.write(f'{alias}: synced')
+        bump_generations({REPLICA_SCOPE})
@@ -0,0 +1,74 @@
+import hashlib
+
+from django.conf import settings
+from django.urls import Resolver404, resolve
+from django.utils.cache import get_conditional_response
+
+from core.utility.cache import get_or_compute, page_cache_version
+
+PAGE_KEY = 'anonymous_page:{prefix}:{url}'
+
+
+class AnonymousPageCacheMiddleware:
+    """
+    Serve one shared cached response of the pages marked with
+    :func:`core.utility.cache.versioned_cache_page` to all the visitors
+    without a session, before the session and the user are loaded.
+
+    Visitors with a session always get the page rendered by the view.
+    Responses setting cookies or holding a stale fragment
+    (`page_fragment`) are never cached. A stale page is served
+    while a single request renders the new version
+    (:func:`core.utility.cache.get_or_compute`). A cached page whose
+    ETag the visitor already has is answered with 304 Not Modified.
+
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        view, kwargs = self.cached_view(request)
+        if view is None:
+            return self.get_response(request)
+
+        request.page_cache_version = page_cache_version(view, kwargs)
+        key = PAGE_KEY.format(
+            prefix=view.cache_key_prefix,
+            url=hashlib.md5(
+                request.build_absolute_uri().encode()
+            ).hexdigest(),
+        )
+        response = get_or_compute(
+            key,
+            request.page_cache_version,
+            lambda: self.get_response(request),
+            view.cache_timeout,
+            cacheable=lambda response: (
+                self.is_cacheable(response)
+                and not getattr(request, 'page_cache_stale', False)
+            ),
+        )
+        return get_conditional_response(
+            request, etag=response.get('ETag'), response=response,
+        )
+
+    def cached_view(self, request):
+        """Return the marked view and its kwargs for anonymous requests."""
+        if request.method not in ('GET', 'HEAD'):
+            return None, None
+        if settings.SESSION_COOKIE_NAME in request.COOKIES:
+            return None, None
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None, None
+        if not hasattr(match.func, 'cache_scopes'):
+            return None, None
+        return match.func, match.kwargs
+
+    def is_cacheable(self, response) -> bool:
+        return (
+            response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+        )
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-17 04:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_auto_20230221_1549'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ObsceneWordForm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('form', models.CharField(db_index=True, max_length=50, verbose_name='Словоформа')),
+                ('word', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='forms', to='core.ObsceneWord', verbose_name='Запрещенное слово')),
+            ],
+            options={
+                'verbose_name': 'Словоформа запрещенного слова',
+                'verbose_name_plural': 'Словоформы запрещенных слов',
+                'unique_together': {('word', 'form')},
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+from core.utility.morphology import get_word_forms
+
+
+def fill_obscenewordforms(apps, schema_editor):
+    """Store the inflected forms of the existing obscene words."""
+    ObsceneWord = apps.get_model('core', 'ObsceneWord')
+    ObsceneWordForm = apps.get_model('core', 'ObsceneWordForm')
+    ObsceneWordForm.objects.bulk_create(
+        (
+            ObsceneWordForm(word_id=word_id, form=form)
+            for word_id, word in ObsceneWord.objects.values_list('pk', 'word')
+            for form in get_word_forms(word.lower())
+        ),
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_obscenewordform'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            fill_obscenewordforms, migrations.RunPython.noop,
+        ),
+    ]
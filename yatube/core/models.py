@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+
+from core.utility.morphology import get_word_forms
 
 
 class ObsceneWord(models.Model):
@@ -25,3 +27,39 @@ class ObsceneWord(models.Model):
         """Make all words lowercase for convience."""
         self.word = self.word.lower()
         super().save(*args, **kwargs)
+
+    @transaction.atomic
+    def update_forms(self) -> None:
+        """Store all the inflected forms of the word."""
+        self.forms.all().delete()
+        ObsceneWordForm.objects.bulk_create(
+            ObsceneWordForm(word=self, form=form)
+            for form in get_word_forms(self.word)
+        )
+
+
+class ObsceneWordForm(models.Model):
+    """
+    Inflected forms of the :model:`core.ObsceneWord` words, so that
+    censoring a text needs no morphological analysis.
+
+    """
+    word = models.ForeignKey(
+        ObsceneWord,
+        related_name='forms',
+        on_delete=models.CASCADE,
+        verbose_name='Запрещенное слово',
+    )
+    form = models.CharField(
+        max_length=50,
+        db_index=True,
+        verbose_name='Словоформа',
+    )
+
+    class Meta:
+        unique_together = ('word', 'form')
+        verbose_name = 'Словоформа запрещенного слова'
+        verbose_name_plural = 'Словоформы запрещенных слов'
+
+    def __str__(self) -> str:
+        return self.form
@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ObsceneWord
+from .utility.censorship import invalidate_censorship_engine
+
+
+@receiver(post_save, sender=ObsceneWord)
+def obscene_word_saved(sender, instance, **kwargs):
+    """Store the forms of the word and rebuild the censorship engines."""
+    instance.update_forms()
+    invalidate_censorship_engine()
+
+
+@receiver(post_delete, sender=ObsceneWord)
+def obscene_word_deleted(sender, **kwargs):
+    """Rebuild the censorship engines without the deleted word."""
+    invalidate_censorship_engine()
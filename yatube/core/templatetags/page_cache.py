@@ -0,0 +1,53 @@
+from django import template
+
+from core.utility.cache import get_or_compute_version
+
+register = template.Library()
+
+FRAGMENT_KEY = 'page_fragment:{name}:{path}'
+
+
+class PageFragmentNode(template.Node):
+    def __init__(self, nodelist, name: str):
+        self.nodelist = nodelist
+        self.name = name
+
+    def render(self, context) -> str:
+        request = context.get('request')
+        version = getattr(request, 'page_cache_version', None)
+        if version is None:
+            return self.nodelist.render(context)
+        served_version, fragment = get_or_compute_version(
+            FRAGMENT_KEY.format(name=self.name, path=request.get_full_path()),
+            version,
+            lambda: self.nodelist.render(context),
+            request.page_cache_timeout,
+        )
+        if served_version != version:
+            request.page_cache_stale = True
+        return fragment
+
+
+@register.tag
+def page_fragment(parser, token):
+    """
+    Cache a part of a page marked with
+    :func:`core.utility.cache.versioned_cache_page`, shared by all
+    the users, until the page version changes::
+
+        {% page_fragment body %}...{% endpage_fragment %}
+
+    Outside of such pages the fragment is rendered every time.
+    Serving a fragment of a previous version sets
+    `request.page_cache_stale`.
+
+    """
+    try:
+        tag_name, name = token.split_contents()
+    except ValueError:
+        raise template.TemplateSyntaxError(
+            f'{token.contents.split()[0]} tag requires a fragment name'
+        )
+    nodelist = parser.parse(('endpage_fragment',))
+    parser.delete_first_token()
+    return PageFragmentNode(nodelist, name)
@@ -0,0 +1,214 @@
+import os
+import pickle
+import shutil
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from core.cache.backends import SizeAwareLRUCache, TieredCache
+from core.cache.serializer import COMPRESSED, PLAIN, Serializer
+from core.cache.stores import LRUStore, SQLiteStore
+
+
+class TestSerializer(SimpleTestCase):
+    """Test suite for the compressing cache serializer."""
+
+    def test_large_values_are_compressed(self):
+        """
+        Test that values over the threshold are compressed
+        and restored unchanged.
+
+        """
+        serializer = Serializer(min_bytes=100)
+        page = '<article><p>Текст поста</p></article>' * 100
+        data = serializer.dumps(page)
+        self.assertTrue(data.startswith(COMPRESSED))
+        self.assertLess(len(data), len(page.encode()) // 4)
+        self.assertEqual(serializer.loads(data), page)
+
+    def test_small_and_legacy_values_are_plain(self):
+        """
+        Test that small values are not compressed and that plain
+        pickles written before the marker are still read.
+
+        """
+        serializer = Serializer(min_bytes=100)
+        self.assertTrue(serializer.dumps('short').startswith(PLAIN))
+        self.assertEqual(serializer.loads(serializer.dumps('short')), 'short')
+        self.assertEqual(serializer.loads(pickle.dumps(42)), 42)
+
+
+class TestLRUStore(SimpleTestCase):
+    """Test suite for the byte-budgeted LRU store."""
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """
+        Test that the entries used the longest time ago are evicted
+        when the byte budget is exceeded.
+
+        """
+        store = LRUStore(max_bytes=30)
+        store.set('a', b'x' * 9, None)
+        store.set('b', b'x' * 9, None)
+        store.set('c', b'x' * 9, None)
+        store.get('a')
+        store.set('d', b'x' * 9, None)
+
+        self.assertIsNotNone(store.get('a'))
+        self.assertIsNone(store.get('b'))
+        self.assertIsNotNone(store.get('c'))
+        self.assertIsNotNone(store.get('d'))
+        self.assertEqual(store.stats()['evictions'], 1)
+        self.assertEqual(store.stats()['bytes'], 30)
+
+    def test_entry_larger_than_budget_is_not_stored(self):
+        """Test that an entry larger than the budget is skipped."""
+        store = LRUStore(max_bytes=10)
+        store.set('a', b'x' * 5, None)
+        store.set('big', b'x' * 10, None)
+        self.assertIsNone(store.get('big'))
+        self.assertIsNotNone(store.get('a'))
+
+    def test_stats_count_hits_and_misses(self):
+        """Test that the store counts hits and misses."""
+        store = LRUStore(max_bytes=100)
+        store.set('a', b'1', None)
+        store.get('a')
+        store.get('b')
+        stats = store.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_expired_entries_are_missing(self):
+        """Test that an expired entry is removed when read."""
+        store = LRUStore(max_bytes=100)
+        store.set('a', b'1', time.time() - 1)
+        self.assertIsNone(store.get('a'))
+        self.assertEqual(store.stats()['bytes'], 0)
+
+
+class TestSizeAwareLRUCache(SimpleTestCase):
+    """Test suite for the SizeAwareLRUCache backend."""
+
+    def setUp(self):
+        self.cache = SizeAwareLRUCache(
+            'test', {'OPTIONS': {'MAX_BYTES': 1024}},
+        )
+        self.cache.clear()
+
+    def test_values_round_trip(self):
+        """Test the basic cache operations of the backend."""
+        self.cache.set('key', {'value': [1, 2]})
+        self.assertEqual(self.cache.get('key'), {'value': [1, 2]})
+        self.assertFalse(self.cache.add('key', 'other'))
+        self.assertEqual(
+            self.cache.get_many(['key', 'missing']),
+            {'key': {'value': [1, 2]}},
+        )
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_incr(self):
+        """Test that incr adds to the value and fails for missing keys."""
+        self.cache.set('counter', 1, None)
+        self.assertEqual(self.cache.incr('counter', 2), 3)
+        self.assertEqual(self.cache.get('counter'), 3)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_instances_share_store_by_name(self):
+        """Test that the backends of the threads share the entries."""
+        self.cache.set('key', 'value')
+        other = SizeAwareLRUCache('test', {})
+        self.assertEqual(other.get('key'), 'value')
+        self.assertIn('hits', other.stats())
+
+
+class TestTieredCache(SimpleTestCase):
+    """Test suite for the TieredCache backend."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = TieredCache(self.location, {})
+        # Another process: the same L2 file with an L1 store of its own.
+        self.other = TieredCache(self.location, {})
+        self.other._l1 = LRUStore(1024 * 1024)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_writes_are_seen_by_other_processes(self):
+        """
+        Test that the L1 copies of the other processes are replaced
+        or dropped after a write.
+
+        """
+        self.cache.set('key', 'first')
+        self.assertEqual(self.other.get('key'), 'first')
+        self.cache.set('key', 'second')
+        self.assertEqual(self.other.get('key'), 'second')
+        self.cache.delete('key')
+        self.assertIsNone(self.other.get('key'))
+
+    def test_l1_copy_is_served_while_current(self):
+        """Test that a current L1 copy is served without reading L2 data."""
+        self.cache.set('key', 'value')
+        self.other.get('key')
+        self.other._l2.get_many = None
+        self.assertEqual(self.other.get('key'), 'value')
+
+    def test_l1_counts_uses_in_lru_order(self):
+        """
+        Test that the L1 reads mark the copies as recently used and
+        count the current copies as hits, the missing and outdated
+        ones as misses.
+
+        """
+        self.other._l1 = LRUStore(70)
+        for key in ('first', 'second'):
+            self.cache.set(key, key)
+            self.other.get(key)
+        self.other.get('first')
+        self.cache.set('third', 'third')
+        self.other.get('third')
+        self.assertTrue(self.other._l1.has(self.other.make_key('first')))
+        self.assertFalse(self.other._l1.has(self.other.make_key('second')))
+
+        self.cache.set('first', 'changed')
+        self.assertEqual(self.other.get('first'), 'changed')
+        stats = self.other.stats()['l1']
+        self.assertEqual((stats['hits'], stats['misses']), (1, 4))
+
+    def test_incr_and_add_are_shared(self):
+        """Test that incr and add work on the shared L2 entries."""
+        self.cache.set('counter', 1, None)
+        self.other.get('counter')
+        self.assertEqual(self.cache.incr('counter'), 2)
+        self.assertEqual(self.other.incr('counter'), 3)
+        self.assertEqual(self.cache.get('counter'), 3)
+
+        self.assertTrue(self.cache.add('lock', True, 60))
+        self.assertFalse(self.other.add('lock', True, 60))
+        self.cache.set('expired', 1, -1)
+        self.assertTrue(self.other.add('expired', 2, 60))
+        self.assertEqual(
+            self.cache.get_many(['counter', 'expired', 'missing']),
+            {'counter': 3, 'expired': 2},
+        )
+
+    def test_entries_over_limit_are_culled(self):
+        """Test that the entries expiring first are culled over the limit."""
+        store = SQLiteStore(self.location, max_entries=2)
+        now = time.time()
+        store.set_many([
+            ('soon', b'1', now + 10),
+            ('later', b'2', now + 100),
+            ('never', b'3', None),
+            ('expired', b'4', now - 1),
+        ])
+        store.purge()
+        self.assertEqual(
+            set(store.stamps(['soon', 'later', 'never', 'expired'])),
+            {'later', 'never'},
+        )
@@ -0,0 +1,83 @@
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from django.db import OperationalError, connections, transaction
+from django.test import SimpleTestCase
+
+WORKERS = 4
+INCREMENTS = 25
+ALIAS = 'contention'
+
+
+def increment(engine: str, path: str, times: int) -> int:
+    """
+    Increment the counter by reading and then writing it in separate
+    statements of one transaction, like the views do; return the number
+    of transactions failed with "database is locked".
+
+    """
+    connections.databases[ALIAS] = {'ENGINE': engine, 'NAME': path}
+    failed = 0
+    for _ in range(times):
+        try:
+            with transaction.atomic(using=ALIAS):
+                with connections[ALIAS].cursor() as cursor:
+                    cursor.execute('SELECT value FROM counter')
+                    value = cursor.fetchone()[0]
+                    time.sleep(0.002)
+                    cursor.execute(
+                        'UPDATE counter SET value = %s', [value + 1],
+                    )
+        except OperationalError:
+            failed += 1
+    connections[ALIAS].close()
+    return failed
+
+
+class TestWriteContention(SimpleTestCase):
+    """
+    Stress test of several processes writing to one SQLite file
+    at once with the stock and the tuned (core.db.sqlite3) backends.
+
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def run_workers(self, engine: str):
+        """Return the failed transactions and the final counter value."""
+        path = os.path.join(self.directory, engine.replace('.', '_'))
+        with sqlite3.connect(path) as db:
+            db.execute('CREATE TABLE counter (value INTEGER NOT NULL)')
+            db.execute('INSERT INTO counter VALUES (0)')
+        with multiprocessing.get_context('fork').Pool(WORKERS) as pool:
+            failed = sum(pool.starmap(
+                increment, [(engine, path, INCREMENTS)] * WORKERS,
+            ))
+        with sqlite3.connect(path) as db:
+            value = db.execute('SELECT value FROM counter').fetchone()[0]
+        return failed, value
+
+    def test_stock_backend_fails_under_contention(self):
+        """Test that concurrent read-then-write transactions fail."""
+        failed, value = self.run_workers('django.db.backends.sqlite3')
+        self.assertGreater(failed, 0)
+        self.assertEqual(value, WORKERS * INCREMENTS - failed)
+
+    def test_tuned_backend_serializes_writers(self):
+        """Test that every transaction waits for its turn and succeeds."""
+        failed, value = self.run_workers('core.db.sqlite3')
+        self.assertEqual(failed, 0)
+        self.assertEqual(value, WORKERS * INCREMENTS)
+        with sqlite3.connect(
+            os.path.join(self.directory, 'core_db_sqlite3')
+        ) as db:
+            journal_mode = db.execute('PRAGMA journal_mode').fetchone()[0]
+        self.assertEqual(journal_mode, 'wal')
@@ -44,3 +44,15 @@ class ObsceneWordModelTests(TestCase):
         obscene_word = ObsceneWordModelTests.obscene_word
         ordering = obscene_word._meta.ordering
         self.assertEqual(ordering[0], 'word')
+
+    def test_forms_are_stored_on_save(self):
+        """Test that the inflected forms of a saved word are stored."""
+        obscene_word = ObsceneWordFactory(word='утро')
+        forms = set(obscene_word.forms.values_list('form', flat=True))
+        self.assertTrue({'утро', 'утром', 'утра'} <= forms)
+
+        obscene_word.word = 'чай'
+        obscene_word.save()
+        forms = set(obscene_word.forms.values_list('form', flat=True))
+        self.assertIn('чая', forms)
+        self.assertNotIn('утром', forms)
@@ -1,8 +1,16 @@
+import time
 from unittest import mock
 
 from django.test import TestCase
 from django.conf import settings
+from django.core.cache import cache
 
+from core.models import ObsceneWord
+from core.utility.cache import (LOCK_KEY, bump_generations, get_generations,
+                                get_or_compute, is_fresh)
+from core.utility.censorship import (_publish_new_version,
+                                     get_censorship_engine)
+from core.utility.morphology import get_morph_analyzer
 from core.utility.utils import hide_obscene_words
 
 
@@ -135,3 +143,164 @@ class TestHideWordsDecorator(TestCase):
                 func = mock.Mock(return_value=original_text)
                 call = hide_obscene_words(words)(func)()
                 self.assertEqual(call, expected_text)
+
+
+class TestCensorshipEngine(TestCase):
+    """Test suite for the process-wide censorship engine."""
+
+    def test_engine_is_reused_until_words_change(self):
+        """
+        Test that the engine is built once and rebuilt only after
+        the obscene word list has changed.
+
+        """
+        ObsceneWord.objects.create(word='утро')
+        engine = get_censorship_engine()
+        self.assertIs(get_censorship_engine(), engine)
+
+        ObsceneWord.objects.create(word='чай')
+        new_engine = get_censorship_engine()
+        self.assertIsNot(new_engine, engine)
+        self.assertEqual(
+            new_engine.censor('Утром пью чай'),
+            f'{settings.GRAWLIX}м пью {settings.GRAWLIX}',
+        )
+
+        ObsceneWord.objects.filter(word='чай').delete()
+        ObsceneWord.objects.get(word='утро').delete()
+        self.assertEqual(
+            get_censorship_engine().censor('Утром пью чай'), 'Утром пью чай',
+        )
+
+    def test_default_word_list_is_read_from_database(self):
+        """
+        Test that hide_obscene_words without arguments uses the current
+        obscene word list.
+
+        """
+        func = mock.Mock(return_value='Доброе утро')
+        decorated = hide_obscene_words()(func)
+        self.assertEqual(decorated(), 'Доброе утро')
+
+        ObsceneWord.objects.create(word='утро')
+        self.assertEqual(decorated(), f'Доброе {settings.GRAWLIX}')
+
+    def test_censoring_needs_no_morphology(self):
+        """
+        Test that the engine built from the database finds the forms
+        of the words without the morphological analyzer.
+
+        """
+        ObsceneWord.objects.create(word='работа')
+        with mock.patch(
+            'core.utility.morphology.get_morph_analyzer',
+            side_effect=AssertionError('morphology is not expected'),
+        ):
+            self.assertEqual(
+                get_censorship_engine().censor('Иду на работу'),
+                f'Иду на {settings.GRAWLIX}',
+            )
+
+    def test_censoring_compiles_no_patterns(self):
+        """
+        Test that the matcher of the words and their forms is compiled
+        with the engine, not on every censored text.
+
+        """
+        ObsceneWord.objects.create(word='работа')
+        engine = get_censorship_engine()
+        with mock.patch(
+            'core.utility.censorship.re.compile',
+            side_effect=AssertionError('compiling is not expected'),
+        ):
+            self.assertEqual(
+                engine.censor('Работы нет, работаю на работе'),
+                f'{settings.GRAWLIX} нет, {settings.GRAWLIX}ю на '
+                f'{settings.GRAWLIX}',
+            )
+
+    def test_version_is_published_again_on_commit(self):
+        """
+        Test that a change of the word list made in a transaction
+        publishes a new engine version after the commit too.
+
+        """
+        with mock.patch(
+            'core.utility.censorship.transaction.on_commit'
+        ) as on_commit:
+            ObsceneWord.objects.create(word='утро')
+        on_commit.assert_called_once_with(_publish_new_version)
+
+    def test_morph_analyzer_is_created_once(self):
+        """Test that the morphological analyzer is shared by the process."""
+        self.assertIs(get_morph_analyzer(), get_morph_analyzer())
+
+
+class TestGenerations(TestCase):
+    """Test suite for the cache generation counters."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_bump_changes_only_given_scopes(self):
+        """Test that bumping a scope leaves the other scopes unchanged."""
+        before = get_generations(['a', 'b'])
+        self.assertEqual(get_generations(['a', 'b']), before)
+
+        bump_generations(['a'])
+        after = get_generations(['a', 'b'])
+        self.assertGreater(after['a'], before['a'])
+        self.assertEqual(after['b'], before['b'])
+
+    def test_lost_generation_is_not_reused(self):
+        """
+        Test that a generation lost by the cache restarts
+        above the previous value.
+
+        """
+        before = get_generations(['a'])['a']
+        cache.clear()
+        self.assertGreater(get_generations(['a'])['a'], before)
+
+
+class TestGetOrCompute(TestCase):
+    """Test suite for the stale-while-revalidate cache."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_value_is_recomputed_for_new_version(self):
+        """Test that a value is reused until its version changes."""
+        compute = mock.Mock(side_effect=['first', 'second'])
+        self.assertEqual(get_or_compute('key', 'v1', compute, 60), 'first')
+        self.assertEqual(get_or_compute('key', 'v1', compute, 60), 'first')
+        self.assertEqual(get_or_compute('key', 'v2', compute, 60), 'second')
+        self.assertEqual(compute.call_count, 2)
+
+    def test_stale_value_is_served_while_locked(self):
+        """
+        Test that a stale value is served without computing while
+        another process holds the lock.
+
+        """
+        get_or_compute('key', 'v1', mock.Mock(return_value='old'), 60)
+        cache.add(LOCK_KEY.format('key'), True)
+        compute = mock.Mock(return_value='new')
+        self.assertEqual(get_or_compute('key', 'v2', compute, 60), 'old')
+        compute.assert_not_called()
+
+        cache.delete(LOCK_KEY.format('key'))
+        self.assertEqual(get_or_compute('key', 'v2', compute, 60), 'new')
+
+    def test_value_is_expired_early_at_random(self):
+        """
+        Test that a value close to its expiry and slow to compute
+        may be considered expired early (probabilistic early expiry).
+
+        """
+        expires = time.time() + 10
+        with mock.patch('core.utility.cache.random.random') as rand:
+            rand.return_value = 0.99
+            self.assertTrue(is_fresh(expires, delta=1))
+            rand.return_value = 1e-10
+            self.assertFalse(is_fresh(expires, delta=1))
@@ -0,0 +1,221 @@
+import functools
+import hashlib
+import math
+import random
+import time
+from typing import Any, Callable, Iterable, Optional, Tuple, Union
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.views.decorators.http import condition
+
+GENERATION_KEY = 'generation:{}'
+# Bumped by the `sync_replicas` command: pages rendered from a replica
+# may miss the writes made since its last copy.
+REPLICA_SCOPE = 'replicas'
+LOCK_KEY = 'lock:{}'
+LOCK_TIMEOUT = 30
+
+
+def generation_key(scope: str) -> str:
+    return GENERATION_KEY.format(scope)
+
+
+def new_generation() -> int:
+    """
+    Return a generation greater than any one handed out before,
+    so that a counter lost by the cache never repeats an old value.
+
+    """
+    return time.time_ns() // 1000
+
+
+def page_scopes(scopes: Iterable[str]) -> list:
+    """Return the scopes of a page, plus the replicas when there are any."""
+    scopes = list(scopes)
+    if settings.REPLICA_DATABASES:
+        scopes.append(REPLICA_SCOPE)
+    return scopes
+
+
+def get_generations(scopes: Iterable[str]) -> dict:
+    """Return the current generation of every scope."""
+    keys = {scope: generation_key(scope) for scope in scopes}
+    found = cache.get_many(keys.values())
+    generations = {}
+    for scope, key in keys.items():
+        if key not in found:
+            generation = new_generation()
+            cache.add(key, generation, None)
+            found[key] = cache.get(key, generation)
+        generations[scope] = found[key]
+    return generations
+
+
+def _bump(scopes: Iterable[str]) -> None:
+    for scope in scopes:
+        key = generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, new_generation(), None)
+
+
+def bump_generations(scopes: Iterable[str]) -> None:
+    """
+    Move the scopes to new generations, making every cached page
+    built from them unreachable.
+
+    Inside a transaction the scopes are bumped again after the commit,
+    so that a page rendered from the uncommitted data in between
+    is not kept under the new generation.
+
+    """
+    scopes = set(scopes)
+    if not scopes:
+        return
+    _bump(scopes)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(scopes))
+
+
+def is_fresh(expires: float, delta: float, beta: float = 1.0) -> bool:
+    """
+    Decide whether a cached value may still be served, expiring it
+    early with a probability growing as the expiry time approaches
+    and with the time it took to compute (the XFetch algorithm).
+
+    """
+    return time.time() - delta * beta * math.log(random.random()) < expires
+
+
+def get_or_compute_version(
+    key: str,
+    version: str,
+    compute: Callable[[], Any],
+    timeout: int,
+    stale_timeout: Optional[int] = None,
+    cacheable: Callable[[Any], bool] = lambda value: True,
+) -> Tuple[str, Any]:
+    """
+    Return the value cached under the key and the version it was
+    computed for, computing and caching it when it is missing,
+    expired or of another version.
+
+    Only one process recomputes a stale value, under a lock; the
+    others keep serving the stale one meanwhile, for up to
+    stale_timeout (settings.CACHE_STALE_TIMEOUT) seconds past the
+    timeout. Values are expired early at random to spread the
+    recomputations.
+
+    """
+    if stale_timeout is None:
+        stale_timeout = settings.CACHE_STALE_TIMEOUT
+    entry = cache.get(key)
+    if entry is not None:
+        entry_version, value, delta, expires = entry
+        if entry_version == version and is_fresh(expires, delta):
+            return version, value
+
+    lock_key = LOCK_KEY.format(key)
+    locked = cache.add(lock_key, True, LOCK_TIMEOUT)
+    if entry is not None and not locked:
+        return entry_version, value
+    try:
+        start = time.time()
+        value = compute()
+        delta = time.time() - start
+        if cacheable(value):
+            cache.set(
+                key,
+                (version, value, delta, time.time() + timeout),
+                timeout + stale_timeout,
+            )
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return version, value
+
+
+def get_or_compute(key: str, version: str, compute: Callable[[], Any],
+                   timeout: int, **kwargs) -> Any:
+    """Return the value of :func:`get_or_compute_version` only."""
+    return get_or_compute_version(
+        key, version, compute, timeout, **kwargs,
+    )[1]
+
+
+def page_cache_version(view: Callable, kwargs: dict) -> str:
+    """
+    Return the version of a page of the view: its key prefix
+    followed by the current generations of its scopes.
+
+    """
+    scopes = view.cache_scopes
+    if callable(scopes):
+        scopes = scopes(**kwargs)
+    scopes = page_scopes(scopes)
+    generations = get_generations(scopes)
+    return '.'.join(
+        [view.cache_key_prefix, *(str(generations[s]) for s in scopes)]
+    )
+
+
+def page_etag(request, version: str) -> str:
+    """
+    Return the ETag of a page version as rendered for the request user:
+    the logged-in users see their own name, forms and buttons on it.
+
+    """
+    user = getattr(request, 'user', None)
+    user_key = user.pk if user is not None and user.is_authenticated else ''
+    return hashlib.md5(f'{version}:{user_key}'.encode()).hexdigest()
+
+
+def versioned_cache_page(
+    timeout: int,
+    key_prefix: str,
+    scopes: Union[Iterable[str], Callable[..., Iterable[str]]],
+) -> Callable:
+    """
+    Mark the view as a cached page whose version is made of the
+    current generations of the scopes: a write bumping any of them
+    makes the cached copies stale at once, whatever the timeout.
+
+    The scopes are a sequence or a function of the view's URL kwargs.
+    :class:`core.middleware.AnonymousPageCacheMiddleware` caches whole
+    responses for anonymous visitors; for the others the templates
+    cache the shared body with the `page_fragment` tag, which uses
+    `request.page_cache_version` and `request.page_cache_timeout`.
+
+    The version is also the ETag of the page (:func:`page_etag`),
+    so unchanged pages are answered with 304 Not Modified unrendered.
+    A page with a fragment of a previous version, served while
+    another process renders the new one, gets no ETag, so that the
+    stale copy is not confirmed as current later on.
+
+    """
+    def decorator(view: Callable) -> Callable:
+        conditional_view = condition(
+            etag_func=lambda request, *args, **kwargs: page_etag(
+                request, request.page_cache_version,
+            ),
+        )(view)
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not hasattr(request, 'page_cache_version'):
+                request.page_cache_version = page_cache_version(
+                    wrapper, kwargs,
+                )
+            request.page_cache_timeout = timeout
+            response = conditional_view(request, *args, **kwargs)
+            if getattr(request, 'page_cache_stale', False):
+                del response['ETag']
+            return response
+        wrapper.cache_timeout = timeout
+        wrapper.cache_key_prefix = key_prefix
+        wrapper.cache_scopes = scopes
+        return wrapper
+    return decorator
@@ -0,0 +1,133 @@
+import re
+import threading
+import uuid
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core.models import ObsceneWord, ObsceneWordForm
+from core.utility.cache import LOCK_KEY
+from core.utility.morphology import get_word_forms
+
+# The forms of the words are matched only between other characters.
+WORD_CHARACTER = r'[a-zа-яё]'
+VERSION_CACHE_KEY = 'obscene_words_version'
+RECENSOR_LOCK = LOCK_KEY.format('recensor')
+# Refreshed after every chunk written, so only a dead run lets it expire.
+RECENSOR_LOCK_TIMEOUT = 10 * 60
+
+
+class CensorshipEngine:
+    """
+    Replace obscene words (both latin and cyrillic alphabetes) and
+    various forms of obscene words (for cyrillics only) with grawlixes.
+
+    The words are matched anywhere in the text and their forms as whole
+    words, by one matcher compiled with the engine, so censoring needs
+    no morphological analysis. Without precomputed forms the lexemes
+    of the words are expanded once.
+
+    """
+    def __init__(self, words: Iterable[str],
+                 forms: Optional[Iterable[str]] = None,
+                 version: Optional[str] = None):
+        self.words = [word.lower() for word in words]
+        if forms is None:
+            forms = set().union(*map(get_word_forms, self.words))
+        self.form_set = frozenset(form.lower() for form in forms).difference(
+            self.words
+        )
+        self.version = version
+        alternatives = list(map(re.escape, self.words))
+        if self.form_set:
+            forms = '|'.join(map(re.escape, sorted(self.form_set)))
+            alternatives.append(
+                f'(?<!{WORD_CHARACTER})(?:{forms})(?!{WORD_CHARACTER})'
+            )
+        self.pattern = re.compile('|'.join(alternatives), flags=re.I)
+
+    def censor(self, text: str, grawlix: str = None) -> str:
+        if not text or not self.words:
+            return text
+        if grawlix is None:
+            grawlix = settings.GRAWLIX
+        return self.pattern.sub(grawlix, text)
+
+
+_engine: Optional[CensorshipEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_censorship_engine() -> CensorshipEngine:
+    """
+    Return the process-wide engine for the :model:`core.ObsceneWord` list.
+
+    The engine is rebuilt when the version stamp of the list, shared
+    between the processes through the cache, changes.
+
+    """
+    global _engine
+    version = cache.get(VERSION_CACHE_KEY)
+    engine = _engine
+    if engine is None or engine.version != version:
+        with _engine_lock:
+            engine = _engine
+            if engine is None or engine.version != version:
+                engine = CensorshipEngine(
+                    ObsceneWord.objects.values_list('word', flat=True),
+                    forms=ObsceneWordForm.objects.values_list(
+                        'form', flat=True,
+                    ),
+                    version=version,
+                )
+                _engine = engine
+    return engine
+
+
+def _publish_new_version() -> None:
+    global _engine
+    with _engine_lock:
+        _engine = None
+    cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+
+
+def invalidate_censorship_engine() -> None:
+    """
+    Make every process rebuild its engine from the current list.
+
+    Inside a transaction a new version is published again after the
+    commit, so that an engine built from the old list in between
+    is not kept under the version published first.
+
+    """
+    _publish_new_version()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(_publish_new_version)
+
+
+def acquire_recensor_lock() -> Optional[str]:
+    """
+    Take the lock of the recensor runs and return its token,
+    or None when another run holds it.
+
+    """
+    token = uuid.uuid4().hex
+    if cache.add(RECENSOR_LOCK, token, RECENSOR_LOCK_TIMEOUT):
+        return token
+    return None
+
+
+def holds_recensor_lock(token: str) -> bool:
+    return cache.get(RECENSOR_LOCK) == token
+
+
+def refresh_recensor_lock() -> None:
+    cache.touch(RECENSOR_LOCK, RECENSOR_LOCK_TIMEOUT)
+
+
+def release_recensor_lock(token: str) -> None:
+    """Release the lock of the recensor runs if the token still holds it."""
+    if holds_recensor_lock(token):
+        cache.delete(RECENSOR_LOCK)
@@ -0,0 +1,38 @@
+import functools
+
+from django.conf import settings
+import pymorphy2
+
+
+@functools.lru_cache(maxsize=None)
+def get_morph_analyzer() -> pymorphy2.MorphAnalyzer:
+    """
+    Return the process-wide Russian morphological analyzer:
+    its dictionaries are loaded only once.
+
+    """
+    return pymorphy2.MorphAnalyzer(lang='ru')
+
+
+@functools.lru_cache(maxsize=settings.NORMAL_FORMS_CACHE_SIZE)
+def get_normal_form(word: str) -> str:
+    """
+    Return the normal form (lemma) of the lowercase word.
+
+    The results are kept in a thread-safe LRU cache shared by the process.
+
+    """
+    return get_morph_analyzer().parse(word)[0].normal_form
+
+
+def get_word_forms(word: str) -> set:
+    """
+    Return all the inflected forms (the lexeme) of the lowercase word
+    in its normal form, including the word itself.
+
+    """
+    forms = {word}
+    for parsed_word in get_morph_analyzer().parse(word):
+        if parsed_word.normal_form == word:
+            forms.update(form.word for form in parsed_word.lexeme)
+    return forms
@@ -0,0 +1,228 @@
+import base64
+import binascii
+import datetime
+import json
+from typing import Optional, Sequence
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db.models import Q
+from django.db.models.query import QuerySet
+from django.utils.functional import cached_property
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(Exception):
+    """The cursor cannot be decoded."""
+
+
+class CountedPaginator(Paginator):
+    """
+    Paginator taking the number of objects from a count provider
+    instead of running COUNT(*) over the object list.
+
+    The provider must have a count() method and an `approximate`
+    attribute. Approximate counts do not limit the page number:
+    pages past the estimate are simply empty.
+
+    """
+    def __init__(self, object_list, per_page, count_provider, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_provider = count_provider
+
+    @cached_property
+    def count(self) -> int:
+        return self.count_provider.count()
+
+    @property
+    def count_is_approximate(self) -> bool:
+        """Whether the count is an estimate; known once counted."""
+        self.count
+        return self.count_provider.approximate
+
+    def validate_number(self, number) -> int:
+        if not self.count_is_approximate:
+            return super().validate_number(number)
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number) -> Page:
+        if not self.count_is_approximate:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(
+            self.object_list[bottom:bottom + self.per_page], number, self,
+        )
+
+
+class CursorPage(Page):
+    """
+    A page of a keyset-paginated list.
+
+    Pages have no numbers: navigation is done with the opaque
+    next_cursor and previous_cursor tokens.
+
+    """
+    def __init__(self, object_list, paginator,
+                 next_cursor: Optional[str] = None,
+                 previous_cursor: Optional[str] = None):
+        super().__init__(object_list, None, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self) -> str:
+        return f'<Page after {self.previous_cursor or "start"}>'
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+
+class CursorPaginator(Paginator):
+    """
+    Paginate a queryset by seeking on the ordering keys instead of
+    using OFFSET, so that any page costs the same as the first one.
+
+    The ordering keys must be unique together, share the same direction
+    and be available as attributes of the objects (fields or annotations).
+    The inherited count and num_pages still issue COUNT(*) and should not
+    be used in templates.
+
+    """
+    is_cursor = True
+
+    def __init__(self, object_list: QuerySet, per_page: int,
+                 ordering: Sequence[str] = ('-pub_date', '-pk'), **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.descending = ordering[0].startswith('-')
+        self.keys = tuple(key.lstrip('-') for key in ordering)
+        self.ordering = tuple(ordering)
+        self.reversed_ordering = tuple(
+            key if self.descending else f'-{key}' for key in self.keys
+        )
+
+    @cached_property
+    def key_fields(self) -> list:
+        """Return the model (or annotation output) fields of the keys."""
+        opts = self.object_list.model._meta
+        annotations = self.object_list.query.annotations
+        return [
+            annotations[key].output_field if key in annotations
+            else opts.pk if key == 'pk' else opts.get_field(key)
+            for key in self.keys
+        ]
+
+    def encode_cursor(self, direction: str, obj) -> str:
+        """Return an url-safe token pointing at the object's keys."""
+        values = []
+        for key in self.keys:
+            value = getattr(obj, key)
+            if isinstance(value, (datetime.date, datetime.time)):
+                value = value.isoformat()
+            values.append(value)
+        data = json.dumps([direction, *values]).encode()
+        return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+    def decode_cursor(self, cursor: str):
+        """
+        Return the direction and the key values stored in the token,
+        converted by the fields of the keys so that a forged token
+        cannot break the query.
+
+        """
+        try:
+            padding = '=' * (-len(cursor) % 4)
+            direction, *values = json.loads(
+                base64.urlsafe_b64decode(cursor + padding)
+            )
+        except (binascii.Error, ValueError, TypeError):
+            raise InvalidCursor(cursor)
+        if direction not in (NEXT, PREVIOUS) or len(values) != len(self.keys):
+            raise InvalidCursor(cursor)
+        if None in values:
+            raise InvalidCursor(cursor)
+        try:
+            values = [
+                field.get_prep_value(field.to_python(value))
+                for field, value in zip(self.key_fields, values)
+            ]
+            if any(isinstance(value, int) and value.bit_length() > 63
+                   for value in values):
+                raise ValueError('Integer out of the database range')
+        except (ValidationError, ValueError, TypeError):
+            raise InvalidCursor(cursor)
+        return direction, values
+
+    def seek(self, direction: str, values) -> Q:
+        """
+        Return a filter selecting the objects after (or before)
+        the given key values in the pagination order.
+
+        """
+        forward = direction == NEXT
+        lookup = 'lt' if forward == self.descending else 'gt'
+        condition = Q()
+        for position, key in enumerate(self.keys):
+            ties = {
+                prev_key: prev_value for prev_key, prev_value in zip(
+                    self.keys[:position], values[:position]
+                )
+            }
+            condition |= Q(**ties, **{f'{key}__{lookup}': values[position]})
+        return condition
+
+    def page(self, cursor: Optional[str] = None) -> CursorPage:
+        """Return the page the cursor points at; the first page if None."""
+        direction, values = NEXT, None
+        if cursor:
+            direction, values = self.decode_cursor(cursor)
+
+        queryset = self.object_list
+        if values is not None:
+            queryset = queryset.filter(self.seek(direction, values))
+        ordering = (
+            self.ordering if direction == NEXT else self.reversed_ordering
+        )
+        objects = list(queryset.order_by(*ordering)[:self.per_page + 1])
+        has_more = len(objects) > self.per_page
+        objects = objects[:self.per_page]
+
+        if direction == PREVIOUS:
+            if not objects:
+                return self.page()
+            objects.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        return CursorPage(
+            objects,
+            self,
+            next_cursor=(
+                self.encode_cursor(NEXT, objects[-1])
+                if has_next and objects else None
+            ),
+            previous_cursor=(
+                self.encode_cursor(PREVIOUS, objects[0])
+                if has_previous and objects else None
+            ),
+        )
+
+    def get_page(self, cursor: Optional[str] = None) -> CursorPage:
+        """Return a valid page, falling back to the first one."""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
@@ -1,32 +1,63 @@
 import re
 import functools
-from typing import Iterable
+from typing import Iterable, Optional, Sequence
 
 from django.core.paginator import Paginator, Page
 from django.conf import settings
 from django.db.models.query import QuerySet
 from django.http import HttpRequest
-import pymorphy2
+from django.utils.html import escape
 
-from core.models import ObsceneWord
+from core.utility.censorship import CensorshipEngine, get_censorship_engine
+from core.utility.paginators import CountedPaginator, CursorPaginator
 
+HASHTAG_PATTERN = r'(#(?P<word>\w+))'
 
-OBSCENE_WORDS: QuerySet = ObsceneWord.objects.values_list(
-    'word', flat=True)
 
-
-def get_page_obj(request: HttpRequest, obj: QuerySet) -> Page:
+def get_page_obj(
+    request: HttpRequest,
+    obj: QuerySet,
+    cursor: Optional[bool] = None,
+    ordering: Sequence[str] = ('-pub_date', '-pk'),
+    count_provider=None,
+    per_page: Optional[int] = None,
+) -> Page:
     """
     Return a Page object with the given page number as per HttpRequest.
 
+    With cursor pagination (settings.CURSOR_PAGINATION or cursor=True)
+    the page is selected by the `cursor` GET parameter and the queryset
+    is ordered by the ordering keys instead.
+    A count provider replaces COUNT(*) for page-number pagination.
+    Pages hold settings.TOTAL_ON_PAGE objects unless per_page is given.
+
     """
-    paginator = Paginator(object_list=obj, per_page=settings.TOTAL_ON_PAGE)
+    if cursor is None:
+        cursor = settings.CURSOR_PAGINATION
+    if per_page is None:
+        per_page = settings.TOTAL_ON_PAGE
+    if cursor:
+        paginator = CursorPaginator(
+            object_list=obj,
+            per_page=per_page,
+            ordering=ordering,
+        )
+        return paginator.get_page(request.GET.get('cursor'))
+
+    if count_provider is not None:
+        paginator = CountedPaginator(
+            object_list=obj,
+            per_page=per_page,
+            count_provider=count_provider,
+        )
+    else:
+        paginator = Paginator(object_list=obj, per_page=per_page)
     page_num = request.GET.get('page')
     return paginator.get_page(page_num)
 
 
 def hide_obscene_words(
-    obscene_words: Iterable[str] = OBSCENE_WORDS,
+    obscene_words: Optional[Iterable[str]] = None,
     grawlix: str = settings.GRAWLIX,
 ) -> callable:
     """
@@ -34,45 +65,56 @@ def hide_obscene_words(
     and various forms of obscene words (for cyrillics only) and
     replace them with grawlixes.
 
+    Without obscene_words the :model:`core.ObsceneWord` list is used
+    through the process-wide censorship engine.
+
     """
+    engine = None
+    if obscene_words is not None:
+        engine = CensorshipEngine(
+            [] if isinstance(obscene_words, str) else obscene_words
+        )
+
     def decorator(func) -> callable:
         @functools.wraps(func)
         def wrapper(*args, **kwargs) -> str:
             text: str = func(*args, **kwargs)
-            if text and obscene_words and not isinstance(obscene_words, str):
-                morph = pymorphy2.MorphAnalyzer(lang='ru')
-                words_to_be_censored = obscene_words[:]
-                all_words = re.findall(r'[a-zа-яё]+', text, flags=re.I)
-                for word in all_words:
-                    parsed_word = morph.parse(word)[0]
-                    if parsed_word.normal_form in obscene_words:
-                        words_to_be_censored.append(parsed_word.word)
-                pattern = fr"{'|'.join(words_to_be_censored)}"
-                censored_text: str = re.sub(
-                    pattern, grawlix, text, flags=re.I,
-                )
-                return censored_text
-            return text
+            return (engine or get_censorship_engine()).censor(text, grawlix)
         return wrapper
     return decorator
 
 
-def add_hashtag_links(func) -> callable:
+def link_hashtags(text: str) -> str:
     """
     Find hashtags and add href links to them.
 
     """
-    def wrapper(*args, **kwargs) -> str:
-        text: str = func(*args, **kwargs)
-        pattern = r'(#(?P<word>\w+))'
-        edited_text: str = re.sub(
-            pattern,
-            r'<a href="/hashtag/\g<word>/">#\g<word></a>',
-            text,
-            flags=re.I,
-        )
-        return edited_text
-    return wrapper
+    edited_text: str = re.sub(
+        HASHTAG_PATTERN,
+        r'<a href="/hashtag/\g<word>/">#\g<word></a>',
+        text,
+        flags=re.I,
+    )
+    return edited_text
+
+
+def render_text(text: str) -> str:
+    """
+    Return the HTML of a raw text: escaped, with linked hashtags.
+
+    The hashtags are found in the raw text and only the parts between
+    them are escaped, so that entities like &#39; are not taken
+    for hashtags.
+
+    """
+    parts = []
+    last = 0
+    for match in re.finditer(HASHTAG_PATTERN, text, flags=re.I):
+        parts.append(escape(text[last:match.start()]))
+        parts.append(link_hashtags(match.group()))
+        last = match.end()
+    parts.append(escape(text[last:]))
+    return ''.join(parts)
 
 
 def remove_hashtag_links(text: str) -> str:
@@ -88,3 +130,14 @@ def remove_hashtag_links(text: str) -> str:
         flags=re.I,
     )
     return edited_text
+
+
+def find_hashtags(text: str) -> set:
+    """
+    Return the lowercase hashtag words found in the text.
+
+    """
+    return {
+        match.group('word').lower()
+        for match in re.finditer(HASHTAG_PATTERN, text, flags=re.I)
+    }
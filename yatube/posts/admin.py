@@ -1,7 +1,10 @@
 from django.contrib import admin
+from django.db.models.expressions import RawSQL
 
+from posts import search
 from posts.forms import CommentAdminForm
-from posts.models import Post, Group, Comment, Follow
+from posts.models import (Post, Group, Comment, Follow, Hashtag,
+                          PostImageVariant, RecensorProgress, ThumbnailJob)
 
 
 class GroupAdmin(admin.ModelAdmin):
@@ -15,7 +18,24 @@ class GroupAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
-class PostAdmin(admin.ModelAdmin):
+class FullTextSearchMixin:
+    """
+    Search the objects of the admin changelist with the FTS5 index
+    (:mod:`posts.search`) instead of LIKE scans of the text.
+
+    """
+    search_kind = search.POST
+
+    def get_search_results(self, request, queryset, search_term):
+        match = search.build_match_query(search_term)
+        if not match or not search.is_available():
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(
+            pk__in=RawSQL(search.matching_ids_sql(self.search_kind), [match])
+        ), False
+
+
+class PostAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = (
         'pk',
         'text',
@@ -30,7 +50,7 @@ class PostAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = (
         'pk',
         'text',
@@ -39,6 +59,7 @@ class CommentAdmin(admin.ModelAdmin):
         'post'
     )
     search_fields = ('text',)
+    search_kind = search.COMMENT
     list_filter = ('pub_date', 'post__id')
     form = CommentAdminForm
 
@@ -47,7 +68,32 @@ class FollowAdmin(admin.ModelAdmin):
     list_display = ('pk', 'user', 'author')
 
 
+class HashtagAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'name')
+    search_fields = ('name',)
+
+
+class RecensorProgressAdmin(admin.ModelAdmin):
+    list_display = ('model', 'last_pk', 'version', 'updated')
+    readonly_fields = ('model', 'last_pk', 'version', 'updated')
+
+
+class ThumbnailJobAdmin(admin.ModelAdmin):
+    list_display = ('post', 'image', 'queued', 'attempts', 'error')
+    readonly_fields = ('post', 'image', 'queued', 'attempts', 'error')
+
+
+class PostImageVariantAdmin(admin.ModelAdmin):
+    list_display = ('post', 'format', 'width', 'height', 'image')
+    list_filter = ('format', 'width')
+    readonly_fields = ('post', 'format', 'width', 'height', 'image')
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow, FollowAdmin)
+admin.site.register(Hashtag, HashtagAdmin)
+admin.site.register(RecensorProgress, RecensorProgressAdmin)
+admin.site.register(ThumbnailJob, ThumbnailJobAdmin)
+admin.site.register(PostImageVariant, PostImageVariantAdmin)
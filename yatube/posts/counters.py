@@ -0,0 +1,122 @@
+from collections import Counter
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import F
+from django.db.models.query import QuerySet
+
+from core.utility.utils import find_hashtags
+from .models import Post, PostCounter
+
+ALL_POSTS = 'all'
+SCOPE_MAX_LENGTH = PostCounter._meta.get_field('scope').max_length
+
+
+def group_scope(group_id: int) -> str:
+    return f'group:{group_id}'
+
+
+def author_scope(author_id: int) -> str:
+    return f'author:{author_id}'
+
+
+def hashtag_scope(hashtag: str) -> str:
+    return f'hashtag:{hashtag.lower()}'[:SCOPE_MAX_LENGTH]
+
+
+def post_scopes(
+    author_id: int, group_id: Optional[int] = None, text: str = '',
+) -> set:
+    """Return the counter scopes a post with the given values belongs to."""
+    scopes = {ALL_POSTS, author_scope(author_id)}
+    if group_id is not None:
+        scopes.add(group_scope(group_id))
+    scopes.update(hashtag_scope(hashtag) for hashtag in find_hashtags(text))
+    return scopes
+
+
+def update_counters(scopes: Iterable[str], delta: int) -> None:
+    """
+    Add delta to the seeded counters of the scopes.
+
+    Counters that have not been seeded yet are left missing: they will
+    be counted when they are read for the first time.
+
+    """
+    scopes = list(scopes)
+    if scopes:
+        PostCounter.objects.filter(scope__in=scopes).update(
+            value=F('value') + delta
+        )
+
+
+def recount_all() -> int:
+    """Recount the posts of every scope; return the number of scopes."""
+    counters = Counter()
+    posts = Post.objects.values_list('author_id', 'group_id', 'text')
+    for author_id, group_id, text in posts.iterator():
+        counters.update(post_scopes(author_id, group_id, text))
+    with transaction.atomic():
+        PostCounter.objects.all().delete()
+        PostCounter.objects.bulk_create(
+            (
+                PostCounter(scope=scope, value=value)
+                for scope, value in counters.items()
+            ),
+            batch_size=500,
+        )
+    return len(counters)
+
+
+class PostCountProvider:
+    """
+    Count the posts of a scope using its :model:`posts.PostCounter`.
+
+    A missing counter is seeded with a bounded COUNT: scopes with fewer
+    posts than settings.POST_COUNT_EXACT_LIMIT get their exact count
+    stored, larger ones get an approximate count (the limit itself)
+    until `manage.py recount_posts` seeds them.
+
+    The counter is checked, counted and created in one transaction of
+    the database it is written to, never from a possibly stale replica
+    the view reads from. The core.db.sqlite3 backend begins
+    it with BEGIN IMMEDIATE, so no post is written in between and
+    missed by both the count and :func:`update_counters`.
+
+    """
+    def __init__(self, scope: str, queryset: QuerySet):
+        self.scope = scope
+        self.queryset = queryset
+        self.approximate = False
+        self._value = None
+
+    def count(self) -> int:
+        if self._value is None:
+            self._value = self._get_count()
+        return self._value
+
+    def _stored_count(self, using: Optional[str] = None) -> Optional[int]:
+        return PostCounter.objects.using(using).filter(
+            scope=self.scope,
+        ).values_list('value', flat=True).first()
+
+    def _get_count(self) -> int:
+        value = self._stored_count()
+        if value is not None:
+            return value
+
+        limit = settings.POST_COUNT_EXACT_LIMIT
+        using = router.db_for_write(PostCounter)
+        with transaction.atomic(using=using):
+            value = self._stored_count(using)
+            if value is not None:
+                return value
+            value = self.queryset.using(using).order_by()[:limit].count()
+            if value < limit:
+                PostCounter.objects.using(using).create(
+                    scope=self.scope, value=value,
+                )
+        if value >= limit:
+            self.approximate = True
+        return value
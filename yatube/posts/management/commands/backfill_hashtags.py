@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from core.utility.utils import find_hashtags
+from posts.models import Hashtag, Post, PostHashtag
+
+
+class Command(BaseCommand):
+    help = 'Index the hashtags of the existing posts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Number of posts read per query.',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        last_pk = 0
+        total = 0
+        while True:
+            chunk = list(
+                Post.objects.filter(pk__gt=last_pk).order_by('pk').values_list(
+                    'pk', 'pub_date', 'text',
+                )[:chunk_size]
+            )
+            if not chunk:
+                break
+            for post_id, pub_date, text in chunk:
+                PostHashtag.objects.link(post_id, pub_date, {
+                    Hashtag.normalize(word) for word in find_hashtags(text)
+                })
+            last_pk = chunk[-1][0]
+            total += len(chunk)
+            self.stdout.write(f'Indexed {total} posts')
+        self.stdout.write(self.style.SUCCESS(f'Done: {total} posts indexed.'))
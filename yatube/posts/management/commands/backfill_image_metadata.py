@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Store the width, height, byte size and SHA-256 digest '
+        'of the existing post images on the posts.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Number of posts read per query.',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Read again the images whose metadata is already stored.',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').only('pk', 'image')
+        if not options['all']:
+            posts = posts.filter(image_size__isnull=True)
+
+        chunk_size = options['chunk_size']
+        last_pk = 0
+        total = missing = 0
+        while True:
+            chunk = list(posts.filter(pk__gt=last_pk).order_by('pk')[
+                :chunk_size
+            ])
+            if not chunk:
+                break
+            for post in chunk:
+                post.read_image_metadata()
+                if post.image_size is None:
+                    missing += 1
+                    self.stderr.write(
+                        f'Post {post.pk}: cannot read {post.image}'
+                    )
+            Post.objects.bulk_update(chunk, Post.IMAGE_METADATA_FIELDS)
+            last_pk = chunk[-1].pk
+            total += len(chunk)
+            self.stdout.write(f'Read {total} images')
+        self.stdout.write(self.style.SUCCESS(
+            f'Done: {total - missing} images read, {missing} missing.'
+        ))
@@ -0,0 +1,148 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.db.models import F, Q
+
+from posts.models import Post, PostImageVariant, ThumbnailJob
+from posts.thumbnails import image_variants, make_variants, variant_name
+
+MAX_ATTEMPTS = 3
+
+
+class Command(BaseCommand):
+    help = (
+        'Make the thumbnails and the responsive variants of the queued '
+        'post images in a process pool. '
+        'Runs until stopped unless --once is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Number of image processing processes.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=20,
+            help='Number of jobs taken from the queue at once.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Seconds to wait for new jobs when the queue is empty.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit when the queue is empty.',
+        )
+        parser.add_argument(
+            '--enqueue-missing',
+            action='store_true',
+            help='Queue the post images that have no thumbnail or '
+                 'variants yet.',
+        )
+
+    def handle(self, *args, **options):
+        if options['enqueue_missing']:
+            self.enqueue_missing()
+
+        # Forked workers must not share the database connections.
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            while True:
+                if self.process_batch(executor, options['batch_size']):
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+
+    def enqueue_missing(self) -> None:
+        posts = Post.objects.exclude(image='').filter(
+            Q(thumbnail='') | Q(image_variants__isnull=True),
+            thumbnail_job__isnull=True,
+        ).distinct()
+        for post in posts.iterator():
+            ThumbnailJob.objects.enqueue(post)
+
+    def variants(self, job) -> list:
+        return image_variants(
+            job.post_id, job.image,
+            job.post.thumbnail_size(),
+            settings.POST_IMAGE_VARIANT_WIDTHS,
+            settings.POST_IMAGE_VARIANT_FORMATS,
+        )
+
+    def process_batch(self, executor, batch_size: int) -> int:
+        """Make the variants of a batch of jobs; return its size."""
+        jobs = list(
+            ThumbnailJob.objects.select_related('post').filter(
+                attempts__lt=MAX_ATTEMPTS,
+            )[:batch_size]
+        )
+        futures = [
+            (job, executor.submit(
+                make_variants,
+                default_storage.path(job.image),
+                [
+                    (default_storage.path(variant.name), variant.width,
+                     variant.height, variant.format)
+                    for variant in self.variants(job)
+                ],
+                job.post.thumbnail_size(),
+            ))
+            for job in jobs
+        ]
+        for job, future in futures:
+            try:
+                future.result()
+            except Exception as error:
+                ThumbnailJob.objects.filter(pk=job.pk).update(
+                    attempts=F('attempts') + 1, error=repr(error),
+                )
+                self.stderr.write(f'Post {job.post_id}: {error!r}')
+            else:
+                self.finish(job)
+                self.stdout.write(f'Post {job.post_id}: done')
+        return len(jobs)
+
+    @transaction.atomic
+    def finish(self, job) -> None:
+        """
+        Attach the variants to the post unless its image has been
+        replaced meanwhile, and remove the job. The full size JPEG
+        variant is the thumbnail shown by the browsers without srcset.
+
+        """
+        variants = self.variants(job)
+        post = Post.objects.filter(pk=job.post_id, image=job.image).first()
+        if post is not None:
+            names = [variant.name for variant in variants]
+            if post.thumbnail.name not in names:
+                post.thumbnail.delete(save=False)
+            for old in post.image_variants.exclude(image__in=names):
+                old.image.delete(save=False)
+            post.image_variants.all().delete()
+            PostImageVariant.objects.bulk_create(
+                PostImageVariant(
+                    post=post, image=variant.name, width=variant.width,
+                    height=variant.height, format=variant.format,
+                )
+                for variant in variants
+            )
+            post.thumbnail = variant_name(
+                post.pk, job.image, settings.POST_THUMBNAIL_SIZE[0], 'jpeg',
+            )
+            post.save(update_fields=('thumbnail', 'updated'))
+        ThumbnailJob.objects.filter(
+            pk=job.pk, image=job.image, queued=job.queued,
+        ).delete()
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts import search
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = 'Index the texts of all the posts and comments for search.'
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError('The search index requires SQLite FTS5.')
+        documents = (
+            (search.POST, Post.objects.values_list('pk', 'pk', 'text')),
+            (
+                search.COMMENT,
+                Comment.objects.values_list('pk', 'post_id', 'text'),
+            ),
+        )
+        for kind, rows in documents:
+            total = 0
+            with transaction.atomic():
+                for object_id, post_id, text in rows.iterator():
+                    search.index_document(kind, object_id, post_id, text)
+                    total += 1
+            self.stdout.write(f'Indexed {total} {rows.model.__name__} rows')
+        self.stdout.write(self.style.SUCCESS('Done.'))
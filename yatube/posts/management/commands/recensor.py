@@ -0,0 +1,219 @@
+import hashlib
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.utils import timezone
+
+from core.utility.cache import bump_generations
+from core.utility.censorship import (CensorshipEngine, acquire_recensor_lock,
+                                     get_censorship_engine,
+                                     holds_recensor_lock,
+                                     refresh_recensor_lock,
+                                     release_recensor_lock)
+from posts import search
+from posts.counters import post_scopes, update_counters
+from posts.models import Comment, Post, PostHashtag, RecensorProgress
+from posts.page_cache import post_page, post_page_scopes
+from posts.signals import current_page_scopes
+
+_engine = None
+
+
+def init_worker(words, forms) -> None:
+    """
+    Build the censorship engine of a worker process.
+
+    The workers are forked: this module imports the models, so a worker
+    started by `spawn` could not unpickle its tasks before Django is set
+    up. Hence the command does not run where `fork` is unavailable
+    (Windows).
+
+    """
+    global _engine
+    _engine = CensorshipEngine(words, forms=forms)
+
+
+def censor_rows(rows, grawlix: str) -> dict:
+    """Return the new texts of the rows changed by the censorship."""
+    changed = {}
+    for pk, text in rows:
+        censored = _engine.censor(text, grawlix)
+        if censored != text:
+            changed[pk] = censored
+    return changed
+
+
+class Command(BaseCommand):
+    help = (
+        'Censor the existing posts and comments with the current '
+        'obscene word list. An interrupted run resumes where it stopped.'
+    )
+    models = (Post, Comment)
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Number of rows read and written at once.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Number of censoring processes.',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore the saved progress and start from the first row.',
+        )
+        parser.add_argument(
+            '--lock-token',
+            help='Token of the run lock already taken by the caller.',
+        )
+
+    def handle(self, *args, **options):
+        """Run the censorship under a lock: one run at a time."""
+        token = options['lock_token']
+        if token is None:
+            token = acquire_recensor_lock()
+            if token is None:
+                raise CommandError('Another recensor run is in progress.')
+        elif not holds_recensor_lock(token):
+            raise CommandError('The run lock is not held by this token.')
+        try:
+            self.run(**options)
+        finally:
+            release_recensor_lock(token)
+
+    def run(self, **options):
+        engine = get_censorship_engine()
+        if not engine.words:
+            self.stdout.write('The obscene word list is empty.')
+            return
+        version = hashlib.md5(
+            '\n'.join(sorted(engine.words)).encode()
+        ).hexdigest()
+
+        self.max_pending = 2 * options['workers']
+        # Forked workers must not share the database connections.
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=options['workers'],
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=init_worker,
+            initargs=(engine.words, sorted(engine.form_set)),
+        ) as executor:
+            for model in self.models:
+                self.recensor(
+                    executor, model, version,
+                    options['chunk_size'], options['restart'],
+                )
+        self.stdout.write(self.style.SUCCESS('Done.'))
+
+    def recensor(self, executor, model, version: str, chunk_size: int,
+                 restart: bool) -> None:
+        """Censor the rows of the model after the saved checkpoint."""
+        progress, _ = RecensorProgress.objects.get_or_create(
+            model=model._meta.label,
+        )
+        if restart or progress.version != version:
+            progress.version = version
+            progress.last_pk = 0
+            progress.save()
+
+        total = model.objects.count()
+        done = model.objects.filter(pk__lte=progress.last_pk).count()
+        pending = deque()
+        for chunk in self.read_chunks(model, progress.last_pk, chunk_size):
+            pending.append((chunk, executor.submit(
+                censor_rows, chunk, settings.GRAWLIX,
+            )))
+            if len(pending) >= self.max_pending:
+                done += self.write_chunk(model, progress, *pending.popleft())
+                self.stdout.write(f'{model._meta.label}: {done}/{total}')
+        while pending:
+            done += self.write_chunk(model, progress, *pending.popleft())
+            self.stdout.write(f'{model._meta.label}: {done}/{total}')
+
+    def read_chunks(self, model, last_pk: int, chunk_size: int):
+        """Yield lists of (pk, text) rows in the primary key order."""
+        while True:
+            chunk = list(
+                model.objects.filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', 'text')[:chunk_size].iterator()
+            )
+            if not chunk:
+                return
+            yield chunk
+            last_pk = chunk[-1][0]
+
+    def write_chunk(self, model, progress, chunk, future) -> int:
+        """
+        Save the censored texts of a chunk and move the checkpoint.
+
+        Rows edited since they were read are left to the form
+        validation, which already censors new texts. bulk_update sends
+        no signals, so the indexes, counters and cached pages the
+        signal receivers maintain are updated here.
+
+        """
+        changed = future.result()
+        texts = dict(chunk)
+        queryset = model.objects.all()
+        if model is Post:
+            queryset = queryset.select_related('author', 'group')
+        with transaction.atomic():
+            objs = []
+            for obj in queryset.in_bulk(list(changed)).values():
+                if obj.text == texts[obj.pk]:
+                    obj.text = changed[obj.pk]
+                    obj.updated = timezone.now()
+                    obj.render()
+                    objs.append(obj)
+            model.objects.bulk_update(objs, self.rendered_fields(model))
+            scopes = set()
+            for obj in objs:
+                scopes |= self.reindex(obj, texts[obj.pk])
+            bump_generations(scopes)
+            progress.last_pk = chunk[-1][0]
+            progress.save(update_fields=('last_pk', 'updated'))
+        refresh_recensor_lock()
+        return len(chunk)
+
+    def rendered_fields(self, model) -> list:
+        """Return the raw text, its rendered fields and the stamp."""
+        fields = ['text', 'text_html', 'updated']
+        if model is Post:
+            fields.append('excerpt')
+        return fields
+
+    def reindex(self, obj, old_text: str) -> set:
+        """
+        Update the hashtag and search indexes and the counters of
+        a censored object; return the page cache scopes to expire.
+
+        """
+        if not isinstance(obj, Post):
+            search.index_document(
+                search.COMMENT, obj.pk, obj.post_id, obj.text,
+            )
+            return {post_page(obj.post_id)}
+
+        PostHashtag.objects.sync(obj)
+        search.index_document(search.POST, obj.pk, obj.pk, obj.text)
+        scopes = post_scopes(obj.author_id, obj.group_id, obj.text)
+        old_scopes = post_scopes(obj.author_id, obj.group_id, old_text)
+        update_counters(scopes - old_scopes, 1)
+        update_counters(old_scopes - scopes, -1)
+        return current_page_scopes(obj) | post_page_scopes(
+            obj.author.username,
+            obj.group.slug if obj.group_id else None,
+            old_text,
+        )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import recount_all
+
+
+class Command(BaseCommand):
+    help = 'Recount the posts of every counter scope.'
+
+    def handle(self, *args, **options):
+        total = recount_all()
+        self.stdout.write(self.style.SUCCESS(f'Recounted {total} scopes.'))
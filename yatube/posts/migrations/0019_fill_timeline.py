@@ -0,0 +1,35 @@
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+
+def fill_timeline(apps, schema_editor):
+    """Materialize the follow feed for the existing subscriptions."""
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    Timeline = apps.get_model('posts', 'Timeline')
+
+    for user_id, author_id in Follow.objects.values_list(
+            'user_id', 'author_id').iterator():
+        posts = Post.objects.filter(author_id=author_id).values_list(
+            'pk', 'pub_date'
+        )
+        Timeline.objects.bulk_create(
+            (
+                Timeline(user_id=user_id, post_id=post_id, pub_date=pub_date)
+                for post_id, pub_date in posts.iterator()
+            ),
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_timeline'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_timeline, migrations.RunPython.noop),
+    ]
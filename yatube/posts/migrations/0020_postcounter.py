@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-17 04:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_fill_timeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=150, unique=True, verbose_name='Область')),
+                ('value', models.IntegerField(default=0, verbose_name='Количество постов')),
+            ],
+            options={
+                'verbose_name': 'Счетчик постов',
+                'verbose_name_plural': 'Счетчики постов',
+            },
+        ),
+    ]
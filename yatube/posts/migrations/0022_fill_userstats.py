@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count
+
+BATCH_SIZE = 500
+
+
+def fill_userstats(apps, schema_editor):
+    """Count the posts, followers and subscriptions of existing users."""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Post = apps.get_model('posts', 'Post')
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+
+    def counts(queryset, field):
+        return dict(
+            queryset.values(field).annotate(
+                total=Count('pk')
+            ).values_list(field, 'total')
+        )
+
+    posts = counts(Post.objects.order_by(), 'author')
+    followers = counts(Follow.objects.order_by(), 'author')
+    following = counts(Follow.objects.order_by(), 'user')
+
+    UserStats.objects.bulk_create(
+        (
+            UserStats(
+                user_id=user_id,
+                posts_count=posts.get(user_id, 0),
+                followers_count=followers.get(user_id, 0),
+                following_count=following.get(user_id, 0),
+            )
+            for user_id in User.objects.values_list('pk', flat=True)
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_userstats'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_userstats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 2.2.16 on 2026-10-17 04:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0022_fill_userstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Hashtag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Хэштег')),
+            ],
+            options={
+                'verbose_name': 'Хэштег',
+                'verbose_name_plural': 'Хэштеги',
+                'ordering': ('name',),
+            },
+        ),
+        migrations.CreateModel(
+            name='PostHashtag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('hashtag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_hashtags', to='posts.Hashtag', verbose_name='Хэштег')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_hashtags', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Хэштег поста',
+                'verbose_name_plural': 'Хэштеги постов',
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='hashtags',
+            field=models.ManyToManyField(blank=True, related_name='posts', through='posts.PostHashtag', to='posts.Hashtag', verbose_name='Хэштеги'),
+        ),
+        migrations.AddIndex(
+            model_name='posthashtag',
+            index=models.Index(fields=['hashtag', '-pub_date'], name='posthashtag_tag_pub_date_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='posthashtag',
+            unique_together={('post', 'hashtag')},
+        ),
+    ]
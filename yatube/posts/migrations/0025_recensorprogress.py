@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-17 04:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0024_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecensorProgress',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100, unique=True, verbose_name='Модель')),
+                ('version', models.CharField(blank=True, max_length=32, verbose_name='Версия списка запрещенных слов')),
+                ('last_pk', models.PositiveIntegerField(default=0, verbose_name='Последний обработанный id')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Прогресс перецензурирования',
+                'verbose_name_plural': 'Прогресс перецензурирования',
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.db import migrations
+from django.utils.text import Truncator
+
+from core.utility.utils import remove_hashtag_links, render_text
+
+BATCH_SIZE = 500
+
+
+def fill_rendered_text(apps, schema_editor):
+    """
+    Strip the hashtag links stored in the texts and render
+    the HTML (and the excerpts of the posts) from the raw texts.
+
+    """
+    for model_name in ('Post', 'Comment'):
+        model = apps.get_model('posts', model_name)
+        fields = ['text', 'text_html']
+        if model_name == 'Post':
+            fields.append('excerpt')
+        last_pk = 0
+        while True:
+            chunk = list(
+                model.objects.filter(pk__gt=last_pk).order_by('pk').only(
+                    'pk', 'text',
+                )[:BATCH_SIZE]
+            )
+            if not chunk:
+                break
+            for obj in chunk:
+                obj.text = remove_hashtag_links(obj.text)
+                obj.text_html = render_text(obj.text)
+                if model_name == 'Post':
+                    obj.excerpt = Truncator(obj.text_html).words(
+                        settings.POST_EXCERPT_WORDS, html=True,
+                    )
+            model.objects.bulk_update(chunk, fields)
+            last_pk = chunk[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0026_rendered_text'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_rendered_text, migrations.RunPython.noop),
+    ]
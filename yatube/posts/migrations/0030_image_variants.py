@@ -0,0 +1,31 @@
+# Generated by Django 2.2.16 on 2026-10-17 04:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0029_thumbnails'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostImageVariant',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.ImageField(editable=False, upload_to='posts/thumbnails/', verbose_name='Файл')),
+                ('width', models.PositiveSmallIntegerField(verbose_name='Ширина')),
+                ('height', models.PositiveSmallIntegerField(verbose_name='Высота')),
+                ('format', models.CharField(choices=[('webp', 'WebP'), ('jpeg', 'JPEG')], max_length=4, verbose_name='Формат')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_variants', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Вариант картинки',
+                'verbose_name_plural': 'Варианты картинок',
+                'ordering': ('width',),
+                'unique_together': {('post', 'format', 'width')},
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+from django.db import migrations
+
+from core.utility.utils import find_hashtags
+
+BATCH_SIZE = 500
+
+
+def fill_hashtags(apps, schema_editor):
+    """Index the hashtags of the existing posts."""
+    Hashtag = apps.get_model('posts', 'Hashtag')
+    Post = apps.get_model('posts', 'Post')
+    PostHashtag = apps.get_model('posts', 'PostHashtag')
+    max_length = Hashtag._meta.get_field('name').max_length
+
+    last_pk = 0
+    while True:
+        chunk = list(
+            Post.objects.filter(pk__gt=last_pk).order_by('pk').values_list(
+                'pk', 'pub_date', 'text',
+            )[:BATCH_SIZE]
+        )
+        if not chunk:
+            break
+        post_names = [
+            (post_id, pub_date, {
+                word.lower()[:max_length] for word in find_hashtags(text)
+            })
+            for post_id, pub_date, text in chunk
+        ]
+        names = set().union(*(names for _, _, names in post_names))
+        Hashtag.objects.bulk_create(
+            (Hashtag(name=name) for name in names),
+            ignore_conflicts=True,
+        )
+        hashtag_ids = dict(
+            Hashtag.objects.filter(name__in=names).values_list('name', 'pk')
+        )
+        PostHashtag.objects.bulk_create(
+            (
+                PostHashtag(
+                    post_id=post_id,
+                    hashtag_id=hashtag_ids[name],
+                    pub_date=pub_date,
+                )
+                for post_id, pub_date, names in post_names
+                for name in names
+            ),
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        last_pk = chunk[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0032_list_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_hashtags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.db import migrations
+from django.utils.text import Truncator
+
+from core.utility.utils import render_text
+
+BATCH_SIZE = 500
+
+
+def rerender_apostrophes(apps, schema_editor):
+    """
+    Render again the texts with apostrophes, whose escaped &#39;
+    used to be linked as the hashtag #39.
+
+    """
+    for model_name in ('Post', 'Comment'):
+        model = apps.get_model('posts', model_name)
+        fields = ['text_html']
+        if model_name == 'Post':
+            fields.append('excerpt')
+        last_pk = 0
+        while True:
+            chunk = list(
+                model.objects.filter(
+                    pk__gt=last_pk, text__contains="'",
+                ).order_by('pk').only('pk', 'text')[:BATCH_SIZE]
+            )
+            if not chunk:
+                break
+            for obj in chunk:
+                obj.text_html = render_text(obj.text)
+                if model_name == 'Post':
+                    obj.excerpt = Truncator(obj.text_html).words(
+                        settings.POST_EXCERPT_WORDS, html=True,
+                    )
+            model.objects.bulk_update(chunk, fields)
+            last_pk = chunk[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0033_fill_hashtags'),
+    ]
+
+    operations = [
+        migrations.RunPython(rerender_apostrophes, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,19 @@
+import hashlib
+
 from django.contrib.auth import get_user_model
 from django.db import models
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.core.files.images import get_image_dimensions
+from django.utils.text import Truncator
 from pytils.translit import slugify
 
+from core.utility.utils import find_hashtags, render_text
+
 User = get_user_model()
 
+FEED_BATCH_SIZE = 500
+
 
 class TextBaseModel(models.Model):
     """
@@ -17,7 +25,16 @@ class TextBaseModel(models.Model):
         verbose_name='Дата публикации',
         db_index=True,
     )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения',
+    )
     text = models.TextField()
+    text_html = models.TextField(
+        editable=False,
+        blank=True,
+        verbose_name='HTML текста',
+    )
 
     class Meta:
         abstract = True
@@ -27,6 +44,15 @@ class TextBaseModel(models.Model):
         limit = settings.TEXT_STR_LIMIT
         return self.text[:limit]
 
+    def save(self, *args, **kwargs):
+        """Render the HTML of the raw text once, on write."""
+        self.render()
+        super().save(*args, **kwargs)
+
+    def render(self) -> None:
+        """Fill in the fields rendered from the raw text."""
+        self.text_html = render_text(self.text)
+
 
 class Group(models.Model):
     """
@@ -66,26 +92,59 @@ class Group(models.Model):
         super().save(*args, **kwargs)
 
 
+class Hashtag(models.Model):
+    """
+    A hashtag (lowercase, without #) used in post texts.
+
+    """
+    name = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name='Хэштег',
+    )
+
+    class Meta:
+        ordering = ('name',)
+        verbose_name = 'Хэштег'
+        verbose_name_plural = 'Хэштеги'
+
+    def __str__(self) -> str:
+        return f'#{self.name}'
+
+    @classmethod
+    def normalize(cls, word: str) -> str:
+        """Return the name the hashtag word is stored under."""
+        max_length = cls._meta.get_field('name').max_length
+        return word.lower()[:max_length]
+
+
 class Post(TextBaseModel):
     """
     Posts created by bloggers, related to :model:`posts.Group`.
 
     """
+    IMAGE_METADATA_FIELDS = (
+        'image_width', 'image_height', 'image_size', 'image_hash',
+    )
+
     text = models.TextField(
         verbose_name='Текст поста',
         help_text='Текст нового поста',
     )
+    # The foreign keys are indexed by the composite indexes below.
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         related_name='posts',
         verbose_name='Автор',
+        db_index=False,
     )
     group = models.ForeignKey(
         Group,
         on_delete=models.SET_NULL,
         blank=True,
         null=True,
+        db_index=False,
         related_name='posts',
         verbose_name='Группа',
         help_text='Группа, к которой будет относиться пост',
@@ -95,11 +154,156 @@ class Post(TextBaseModel):
         upload_to='posts/',
         blank=True,
     )
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки',
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки',
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    image_size = models.PositiveIntegerField(
+        'Размер картинки, байт',
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    image_hash = models.CharField(
+        'SHA-256 картинки',
+        max_length=64,
+        blank=True,
+        editable=False,
+    )
+    thumbnail = models.ImageField(
+        'Миниатюра',
+        upload_to='posts/thumbnails/',
+        blank=True,
+        editable=False,
+    )
+    hashtags = models.ManyToManyField(
+        Hashtag,
+        through='PostHashtag',
+        related_name='posts',
+        blank=True,
+        verbose_name='Хэштеги',
+    )
+    excerpt = models.TextField(
+        editable=False,
+        blank=True,
+        verbose_name='Начало текста',
+    )
 
     class Meta(TextBaseModel.Meta):
+        indexes = (
+            models.Index(
+                fields=('author', 'pub_date'),
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=('group', 'pub_date'),
+                name='post_group_pub_date_idx',
+            ),
+        )
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
+    def save(self, *args, **kwargs):
+        """
+        Read the metadata of a new image while it is still in memory,
+        so that nothing has to open the stored file later.
+
+        """
+        if not self.image or not self.image._committed:
+            self.read_image_metadata()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'image' in update_fields:
+                kwargs['update_fields'] = {
+                    *update_fields, *self.IMAGE_METADATA_FIELDS,
+                }
+        super().save(*args, **kwargs)
+
+    def read_image_metadata(self) -> None:
+        """
+        Fill in the geometry, byte size and SHA-256 digest of the image.
+        They are left empty when the file is missing or not an image.
+
+        """
+        self.image_width = self.image_height = self.image_size = None
+        self.image_hash = ''
+        if not self.image:
+            return
+        committed = self.image._committed
+        try:
+            self.image.open('rb')
+            digest = hashlib.sha256()
+            for chunk in self.image.chunks():
+                digest.update(chunk)
+            self.image_width, self.image_height = get_image_dimensions(
+                self.image,
+            )
+            self.image_size = self.image.size
+            self.image_hash = digest.hexdigest()
+        except OSError:
+            return
+        finally:
+            # An upload must stay open until the storage has saved it.
+            if committed:
+                self.image.close()
+
+    def thumbnail_size(self) -> tuple:
+        """
+        Return the size of the thumbnail, found from the stored geometry
+        of the image without opening it: settings.POST_THUMBNAIL_SIZE
+        width, the height keeping the proportions of the image up to
+        settings.POST_THUMBNAIL_MAX_HEIGHT.
+
+        """
+        width, height = settings.POST_THUMBNAIL_SIZE
+        if self.image_width and self.image_height:
+            height = min(
+                round(width * self.image_height / self.image_width),
+                settings.POST_THUMBNAIL_MAX_HEIGHT,
+            )
+        return width, max(height, 1)
+
+    def render(self) -> None:
+        """Also cut the excerpt shown on the post cards."""
+        super().render()
+        self.excerpt = Truncator(self.text_html).words(
+            settings.POST_EXCERPT_WORDS, html=True,
+        )
+
+    def image_sources(self) -> list:
+        """
+        Return the (MIME type, srcset) pairs of the image variants,
+        the modern formats first. Prefetch `image_variants` for lists.
+
+        """
+        srcsets = {}
+        # Sorted here: ordering the prefetch query would need a sort pass.
+        variants = sorted(self.image_variants.all(), key=lambda v: v.width)
+        for variant in variants:
+            srcsets.setdefault(variant.format, []).append(
+                f'{variant.image.url} {variant.width}w'
+            )
+        return [
+            (PostImageVariant.MIME_TYPES[image_format],
+             ', '.join(srcsets[image_format]))
+            for image_format, _ in PostImageVariant.FORMAT_CHOICES
+            if image_format in srcsets
+        ]
+
+    def delete_image_variants(self) -> None:
+        """Delete the thumbnail and the variants of the image."""
+        self.thumbnail.delete(save=False)
+        for variant in self.image_variants.all():
+            variant.image.delete(save=False)
+        self.image_variants.all().delete()
+
 
 class Comment(TextBaseModel):
     """Comments to the posts."""
@@ -108,6 +312,7 @@ class Comment(TextBaseModel):
         verbose_name='Пост',
         related_name='comments',
         on_delete=models.CASCADE,
+        db_index=False,
     )
     author = models.ForeignKey(
         User,
@@ -121,6 +326,12 @@ class Comment(TextBaseModel):
     )
 
     class Meta(TextBaseModel.Meta):
+        indexes = (
+            models.Index(
+                fields=('post', 'pub_date'),
+                name='comment_post_pub_date_idx',
+            ),
+        )
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
@@ -132,21 +343,30 @@ class Follow(models.Model):
     """
     is_cleaned = False
 
+    # The foreign keys are indexed by the unique and the author indexes.
     user = models.ForeignKey(
         User,
         related_name='follower',
         on_delete=models.CASCADE,
         verbose_name='Пользователь',
+        db_index=False,
     )
     author = models.ForeignKey(
         User,
         related_name='following',
         on_delete=models.CASCADE,
         verbose_name='Автор',
+        db_index=False,
     )
 
     class Meta:
         unique_together = ('user', 'author')
+        indexes = (
+            models.Index(
+                fields=('author', 'user'),
+                name='follow_author_user_idx',
+            ),
+        )
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
 
@@ -177,3 +397,355 @@ class Follow(models.Model):
         if not self.is_cleaned:
             self.full_clean()
         super(Follow, self).save(*args, **kwargs)
+
+
+class PostHashtagManager(models.Manager):
+    """
+    Keep the hashtag index in sync with post texts.
+
+    """
+    def sync(self, post) -> None:
+        """Index the hashtags found in the post text, drop the stale ones."""
+        names = {
+            Hashtag.normalize(word) for word in find_hashtags(post.text)
+        }
+        linked = dict(
+            self.filter(post=post).values_list('hashtag__name', 'pk')
+        )
+        stale = [pk for name, pk in linked.items() if name not in names]
+        if stale:
+            self.filter(pk__in=stale).delete()
+        self.link(post.pk, post.pub_date, names - linked.keys())
+
+    def link(self, post_id: int, pub_date, names) -> None:
+        """Link the post to the hashtags, creating the missing ones."""
+        if not names:
+            return
+        Hashtag.objects.bulk_create(
+            (Hashtag(name=name) for name in names),
+            ignore_conflicts=True,
+        )
+        self.bulk_create(
+            (
+                self.model(post_id=post_id, hashtag=hashtag, pub_date=pub_date)
+                for hashtag in Hashtag.objects.filter(name__in=names)
+            ),
+            ignore_conflicts=True,
+        )
+
+
+class PostHashtag(models.Model):
+    """
+    Hashtag index entry; the publication date is copied from the post
+    so that a hashtag page is a range scan over (hashtag, -pub_date).
+
+    """
+    post = models.ForeignKey(
+        Post,
+        related_name='post_hashtags',
+        on_delete=models.CASCADE,
+        verbose_name='Пост',
+    )
+    hashtag = models.ForeignKey(
+        Hashtag,
+        related_name='post_hashtags',
+        on_delete=models.CASCADE,
+        verbose_name='Хэштег',
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    objects = PostHashtagManager()
+
+    class Meta:
+        unique_together = ('post', 'hashtag')
+        indexes = (
+            models.Index(
+                fields=('hashtag', 'pub_date'),
+                name='posthashtag_tag_pub_date_idx',
+            ),
+        )
+        verbose_name = 'Хэштег поста'
+        verbose_name_plural = 'Хэштеги постов'
+
+    def __str__(self) -> str:
+        return f'{self.post_id} - {self.hashtag_id}'
+
+
+class PostCounter(models.Model):
+    """
+    Number of posts in a scope (all posts, a group, an author, a hashtag)
+    kept up to date on post writes, so that paginators do not run COUNT(*).
+
+    """
+    scope = models.CharField(
+        max_length=150,
+        unique=True,
+        verbose_name='Область',
+    )
+    value = models.IntegerField(
+        default=0,
+        verbose_name='Количество постов',
+    )
+
+    class Meta:
+        verbose_name = 'Счетчик постов'
+        verbose_name_plural = 'Счетчики постов'
+
+    def __str__(self) -> str:
+        return f'{self.scope}: {self.value}'
+
+
+class UserStats(models.Model):
+    """
+    Denormalized per-user numbers of posts, followers and subscriptions
+    updated on :model:`posts.Post` and :model:`posts.Follow` writes.
+
+    """
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        related_name='stats',
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+    )
+    posts_count = models.IntegerField(
+        default=0,
+        verbose_name='Количество постов',
+    )
+    followers_count = models.IntegerField(
+        default=0,
+        verbose_name='Количество подписчиков',
+    )
+    following_count = models.IntegerField(
+        default=0,
+        verbose_name='Количество подписок',
+    )
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+    def __str__(self) -> str:
+        return f'Статистика: {self.user.get_username()}'
+
+    @classmethod
+    def increment(cls, user_id: int, **deltas) -> None:
+        """Add the deltas to the user's counters in a single UPDATE."""
+        cls.objects.filter(user_id=user_id).update(**{
+            field: models.F(field) + delta for field, delta in deltas.items()
+        })
+
+
+class TimelineManager(models.Manager):
+    """
+    Keep the materialized follow feed in sync with posts and subscriptions.
+
+    """
+    def fan_out(self, post):
+        """Add a new post to the timelines of all the author's followers."""
+        followers = Follow.objects.filter(
+            author_id=post.author_id,
+        ).values_list('user_id', flat=True)
+        self.bulk_create(
+            (
+                self.model(user_id=user_id, post=post, pub_date=post.pub_date)
+                for user_id in followers.iterator()
+            ),
+            batch_size=FEED_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+    def backfill(self, user_id, author_id):
+        """Add all the author's posts to the user's timeline."""
+        posts = Post.objects.filter(author_id=author_id).values_list(
+            'pk', 'pub_date'
+        )
+        self.bulk_create(
+            (
+                self.model(user_id=user_id, post_id=post_id, pub_date=pub_date)
+                for post_id, pub_date in posts.iterator()
+            ),
+            batch_size=FEED_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+    def prune(self, user_id, author_id):
+        """Remove all the author's posts from the user's timeline."""
+        self.filter(user_id=user_id, post__author_id=author_id).delete()
+
+
+class Timeline(models.Model):
+    """
+    Materialized follow feed: one row per post of each author
+    the user follows, filled on write so that reading the feed
+    is a range scan over the (user, -pub_date) index.
+
+    """
+    user = models.ForeignKey(
+        User,
+        related_name='timeline',
+        on_delete=models.CASCADE,
+        verbose_name='Подписчик',
+    )
+    post = models.ForeignKey(
+        Post,
+        related_name='timeline_entries',
+        on_delete=models.CASCADE,
+        verbose_name='Пост',
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    objects = TimelineManager()
+
+    class Meta:
+        unique_together = ('user', 'post')
+        indexes = (
+            models.Index(
+                fields=('user', 'pub_date'),
+                name='timeline_user_pub_date_idx',
+            ),
+        )
+        ordering = ('-pub_date',)
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+
+    def __str__(self) -> str:
+        return f'{self.user.get_username()} - {self.post_id}'
+
+
+class RecensorProgress(models.Model):
+    """
+    Checkpoint of the `recensor` command for a model, so that
+    an interrupted run resumes after the last written chunk.
+
+    """
+    model = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name='Модель',
+    )
+    version = models.CharField(
+        max_length=32,
+        blank=True,
+        verbose_name='Версия списка запрещенных слов',
+    )
+    last_pk = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Последний обработанный id',
+    )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата обновления',
+    )
+
+    class Meta:
+        verbose_name = 'Прогресс перецензурирования'
+        verbose_name_plural = 'Прогресс перецензурирования'
+
+    def __str__(self) -> str:
+        return f'{self.model}: {self.last_pk}'
+
+
+class ThumbnailJobManager(models.Manager):
+    """
+    Queue of the post images waiting for their thumbnails.
+
+    """
+    def enqueue(self, post) -> None:
+        """Queue the thumbnail of the post image, replacing a queued one."""
+        if not post.image:
+            self.filter(post=post).delete()
+            return
+        self.update_or_create(
+            post=post,
+            defaults={'image': post.image.name, 'attempts': 0, 'error': ''},
+        )
+
+
+class ThumbnailJob(models.Model):
+    """
+    A post image to make the thumbnail of, processed by the
+    `process_thumbnails` command instead of the requests.
+
+    """
+    post = models.OneToOneField(
+        Post,
+        related_name='thumbnail_job',
+        on_delete=models.CASCADE,
+        verbose_name='Пост',
+    )
+    image = models.CharField(
+        max_length=100,
+        verbose_name='Картинка',
+    )
+    queued = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата постановки в очередь',
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попытки',
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name='Ошибка',
+    )
+
+    objects = ThumbnailJobManager()
+
+    class Meta:
+        ordering = ('queued',)
+        verbose_name = 'Задача миниатюры'
+        verbose_name_plural = 'Задачи миниатюр'
+
+    def __str__(self) -> str:
+        return f'{self.post_id}: {self.image}'
+
+
+class PostImageVariant(models.Model):
+    """
+    A downscaled or re-encoded copy of a post image, offered to the
+    browsers in a `srcset` so that they download the smallest one
+    fitting the screen in the best format they support.
+
+    """
+    FORMAT_CHOICES = (
+        ('webp', 'WebP'),
+        ('jpeg', 'JPEG'),
+    )
+    MIME_TYPES = {
+        'webp': 'image/webp',
+        'jpeg': 'image/jpeg',
+    }
+
+    post = models.ForeignKey(
+        Post,
+        related_name='image_variants',
+        on_delete=models.CASCADE,
+        verbose_name='Пост',
+        db_index=False,  # Indexed by the unique index.
+    )
+    image = models.ImageField(
+        'Файл',
+        upload_to='posts/thumbnails/',
+        editable=False,
+    )
+    width = models.PositiveSmallIntegerField(
+        verbose_name='Ширина',
+    )
+    height = models.PositiveSmallIntegerField(
+        verbose_name='Высота',
+    )
+    format = models.CharField(
+        max_length=4,
+        choices=FORMAT_CHOICES,
+        verbose_name='Формат',
+    )
+
+    class Meta:
+        unique_together = ('post', 'format', 'width')
+        verbose_name = 'Вариант картинки'
+        verbose_name_plural = 'Варианты картинок'
+
+    def __str__(self) -> str:
+        return f'{self.post_id}: {self.width}w {self.format}'
@@ -0,0 +1,57 @@
+from typing import Optional
+
+from core.utility.cache import get_generations, page_etag, page_scopes
+from core.utility.utils import find_hashtags
+from .models import Hashtag, Post
+
+ALL_POSTS_PAGES = 'posts'
+
+
+def group_pages(slug: str) -> str:
+    return f'group:{slug}'
+
+
+def author_pages(username: str) -> str:
+    return f'author:{username}'
+
+
+def hashtag_pages(hashtag: str) -> str:
+    return f'hashtag:{Hashtag.normalize(hashtag)}'
+
+
+def post_page(post_id: int) -> str:
+    return f'post:{post_id}'
+
+
+def post_page_scopes(
+    username: str, slug: Optional[str] = None, text: str = '',
+) -> set:
+    """Return the page cache scopes showing a post with the given values."""
+    scopes = {ALL_POSTS_PAGES, author_pages(username)}
+    if slug is not None:
+        scopes.add(group_pages(slug))
+    scopes.update(hashtag_pages(hashtag) for hashtag in find_hashtags(text))
+    return scopes
+
+
+def post_detail_etag(request, post_id: int) -> Optional[str]:
+    """
+    Return the ETag of a post page: the generations of the post
+    (edits and comments), its author and its group pages, found with
+    one primary key query and a cache lookup.
+
+    """
+    row = Post.objects.filter(pk=post_id).values_list(
+        'author__username', 'group__slug',
+    ).first()
+    if row is None:
+        return None
+    username, slug = row
+    scopes = [post_page(post_id), author_pages(username)]
+    if slug is not None:
+        scopes.append(group_pages(slug))
+    scopes = page_scopes(scopes)
+    generations = get_generations(scopes)
+    return page_etag(
+        request, '.'.join(str(generations[scope]) for scope in scopes),
+    )
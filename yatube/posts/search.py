@@ -0,0 +1,120 @@
+import re
+from typing import List
+
+from django.db import connection
+from django.utils.html import strip_tags
+
+from core.utility.morphology import get_normal_form
+from .models import Post
+
+SEARCH_TABLE = 'posts_search'
+POST = 0
+COMMENT = 1
+
+
+def is_available() -> bool:
+    """Whether the database supports the FTS5 search index."""
+    return connection.vendor == 'sqlite'
+
+
+def normalize(text: str) -> List[str]:
+    """Return the normal forms of the words of a text or an HTML snippet."""
+    words = re.findall(r'\w+', strip_tags(text).lower())
+    return [get_normal_form(word) for word in words]
+
+
+def build_match_query(query: str) -> str:
+    """
+    Return an FTS5 query matching documents with all the query words
+    in any of their forms; the words are quoted to escape FTS syntax.
+
+    """
+    return ' '.join(
+        '"{}"'.format(word.replace('"', '""')) for word in normalize(query)
+    )
+
+
+def document_id(kind: int, object_id: int) -> int:
+    """Return the rowid of a post or a comment in the search index."""
+    return object_id * 2 + kind
+
+
+def index_document(kind: int, object_id: int, post_id: int, text: str):
+    """Add or replace a post or a comment in the search index."""
+    if not is_available():
+        return
+    rowid = document_id(kind, object_id)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [rowid]
+        )
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, body, post_id) '
+            'VALUES (%s, %s, %s)',
+            [rowid, ' '.join(normalize(text)), post_id],
+        )
+
+
+def remove_document(kind: int, object_id: int):
+    """Remove a post or a comment from the search index."""
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s',
+            [document_id(kind, object_id)],
+        )
+
+
+def matching_ids_sql(kind: int) -> str:
+    """
+    Return SQL selecting the ids of the posts or the comments matching
+    the FTS query given as the only parameter.
+
+    """
+    return (
+        f'SELECT rowid / 2 FROM {SEARCH_TABLE} '
+        f'WHERE {SEARCH_TABLE} MATCH %s AND (rowid & 1) = {kind}'
+    )
+
+
+class PostSearchResults:
+    """
+    Posts whose text or comments match the query, best match first
+    according to bm25. Sliced and counted lazily, so it can be paginated.
+
+    """
+    def __init__(self, query: str):
+        self.match = build_match_query(query)
+
+    def count(self) -> int:
+        if not self.match or not is_available():
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(DISTINCT post_id) FROM {SEARCH_TABLE} '
+                f'WHERE {SEARCH_TABLE} MATCH %s',
+                [self.match],
+            )
+            return cursor.fetchone()[0]
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __getitem__(self, key: slice) -> List[Post]:
+        if not self.match or not is_available():
+            return []
+        offset = key.start or 0
+        limit = key.stop - offset
+        with connection.cursor() as cursor:
+            # rank is the bm25() score of the FTS5 table, lower is better.
+            cursor.execute(
+                'SELECT post_id, MIN(rank) AS best '
+                f'FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s '
+                'GROUP BY post_id ORDER BY best, post_id DESC '
+                'LIMIT %s OFFSET %s',
+                [self.match, limit, offset],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        posts = Post.objects.select_related('author', 'group').in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
@@ -0,0 +1,246 @@
+from django.conf import settings
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from core.utility.cache import bump_generations
+from . import search
+from .counters import post_scopes, update_counters
+from .models import (Comment, Follow, Group, Post, PostHashtag, Timeline,
+                     UserStats)
+from .page_cache import (author_pages, group_pages, post_page,
+                         post_page_scopes)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    """Deliver a new post to the followers' timelines."""
+    if created:
+        Timeline.objects.fan_out(instance)
+
+
+@receiver(post_save, sender=Post)
+def index_hashtags(sender, instance, **kwargs):
+    """Index the hashtags of the saved post."""
+    PostHashtag.objects.sync(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    """Fill the follower's timeline with the author's posts."""
+    if created:
+        Timeline.objects.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    """Remove the author's posts from the former follower's timeline."""
+    Timeline.objects.prune(instance.user_id, instance.author_id)
+
+
+@receiver(pre_save, sender=Post)
+def remember_saved_scopes(sender, instance, **kwargs):
+    """
+    Remember the counter and page cache scopes of the post
+    before it is updated.
+
+    """
+    instance._counter_scopes = set()
+    instance._page_scopes = set()
+    instance._saved_author_id = None
+    if instance.pk is not None:
+        saved = Post.objects.filter(pk=instance.pk).values(
+            'author_id', 'group_id', 'text', 'author__username', 'group__slug',
+        ).first()
+        if saved is not None:
+            instance._counter_scopes = post_scopes(
+                saved['author_id'], saved['group_id'], saved['text'],
+            )
+            instance._page_scopes = post_page_scopes(
+                saved['author__username'], saved['group__slug'],
+                saved['text'],
+            )
+            instance._saved_author_id = saved['author_id']
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, **kwargs):
+    """Move the post between the counter scopes it left or joined."""
+    scopes = post_scopes(instance.author_id, instance.group_id, instance.text)
+    previous_scopes = getattr(instance, '_counter_scopes', set())
+    update_counters(scopes - previous_scopes, 1)
+    update_counters(previous_scopes - scopes, -1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    """Remove the deleted post from its counter scopes."""
+    update_counters(
+        post_scopes(instance.author_id, instance.group_id, instance.text),
+        -1,
+    )
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_user_stats(sender, instance, created, **kwargs):
+    """Start the statistics of a new user."""
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_author_posts(sender, instance, created, **kwargs):
+    """Count a new post (or a post given to another author)."""
+    saved_author_id = getattr(instance, '_saved_author_id', None)
+    if created:
+        UserStats.increment(instance.author_id, posts_count=1)
+    elif saved_author_id not in (None, instance.author_id):
+        UserStats.increment(saved_author_id, posts_count=-1)
+        UserStats.increment(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_author_post(sender, instance, **kwargs):
+    """Uncount the deleted post."""
+    UserStats.increment(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, **kwargs):
+    """Count a new follower of the author and a subscription of the user."""
+    if created:
+        UserStats.increment(instance.author_id, followers_count=1)
+        UserStats.increment(instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    """Uncount the removed follower and subscription."""
+    UserStats.increment(instance.author_id, followers_count=-1)
+    UserStats.increment(instance.user_id, following_count=-1)
+
+
+@receiver(post_save, sender=Post)
+def index_post_text(sender, instance, **kwargs):
+    """Add the post text to the search index."""
+    search.index_document(
+        search.POST, instance.pk, instance.pk, instance.text,
+    )
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post_text(sender, instance, **kwargs):
+    """Remove the post text from the search index."""
+    search.remove_document(search.POST, instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment_text(sender, instance, **kwargs):
+    """Add the comment text to the search index."""
+    search.index_document(
+        search.COMMENT, instance.pk, instance.post_id, instance.text,
+    )
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment_text(sender, instance, **kwargs):
+    """Remove the comment text from the search index."""
+    search.remove_document(search.COMMENT, instance.pk)
+
+
+def current_page_scopes(post) -> set:
+    return {
+        post_page(post.pk),
+        *post_page_scopes(
+            post.author.username,
+            post.group.slug if post.group_id else None,
+            post.text,
+        ),
+    }
+
+
+@receiver(post_save, sender=Post)
+def expire_saved_post_pages(sender, instance, **kwargs):
+    """Expire the cached pages showing the post before and after saving."""
+    previous_scopes = getattr(instance, '_page_scopes', set())
+    bump_generations(current_page_scopes(instance) | previous_scopes)
+
+
+@receiver(post_delete, sender=Post)
+def expire_deleted_post_pages(sender, instance, **kwargs):
+    """Expire the cached pages showing the deleted post."""
+    bump_generations(current_page_scopes(instance))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def expire_comment_pages(sender, instance, **kwargs):
+    """Expire the cached page of the commented post."""
+    bump_generations({post_page(instance.post_id)})
+
+
+@receiver(pre_save, sender=Group)
+def remember_group_slug(sender, instance, **kwargs):
+    """Remember the slug and the title of the group before it is updated."""
+    instance._saved_slug = instance._saved_title = None
+    if instance.pk is not None:
+        instance._saved_slug, instance._saved_title = Group.objects.filter(
+            pk=instance.pk,
+        ).values_list('slug', 'title').first() or (None, None)
+
+
+def group_post_page_scopes(group) -> set:
+    """Return the page cache scopes showing the posts of the group."""
+    scopes = set()
+    for pk, username, text in group.posts.values_list(
+        'pk', 'author__username', 'text',
+    ).order_by().iterator():
+        scopes.add(post_page(pk))
+        scopes.update(post_page_scopes(username, group.slug, text))
+    return scopes
+
+
+@receiver(pre_delete, sender=Group)
+def remember_group_post_pages(sender, instance, **kwargs):
+    """
+    Remember the pages showing the posts of the group before they are
+    detached from it by a bulk UPDATE, which sends no signals.
+
+    """
+    instance._post_page_scopes = group_post_page_scopes(instance)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def expire_group_pages(sender, instance, **kwargs):
+    """
+    Expire the cached pages of the group and, when it is deleted or
+    its slug or title change, all the pages showing its posts.
+
+    """
+    slugs = {instance.slug, getattr(instance, '_saved_slug', None)} - {None}
+    scopes = {group_pages(slug) for slug in slugs}
+    if hasattr(instance, '_post_page_scopes'):
+        scopes |= instance._post_page_scopes
+    elif getattr(instance, '_saved_slug', None) is not None and (
+        (instance.slug, instance.title)
+        != (instance._saved_slug, instance._saved_title)
+    ):
+        scopes |= group_post_page_scopes(instance)
+    bump_generations(scopes)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def expire_user_pages(sender, instance, **kwargs):
+    """Expire the cached profile of the saved user."""
+    bump_generations({author_pages(instance.username)})
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def expire_follow_pages(sender, instance, **kwargs):
+    """Expire the cached profiles of the follower and the author."""
+    bump_generations({
+        author_pages(instance.user.username),
+        author_pages(instance.author.username),
+    })
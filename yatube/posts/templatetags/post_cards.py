@@ -0,0 +1,64 @@
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import prefetch_related_objects
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+CARD_TEMPLATE = 'includes/blog_card.html'
+
+
+def card_cache_key(post, show_author: bool, show_group: bool) -> str:
+    """
+    Return the cache key of a rendered post card, versioned by
+    the last modification of the post and by the author and group
+    names shown on it, and shared by all list pages.
+
+    """
+    shown = []
+    if show_author:
+        shown += [post.author.username, post.author.get_full_name()]
+    if show_group and post.group_id:
+        shown.append(post.group.slug)
+    names = hashlib.md5('\n'.join(shown).encode()).hexdigest()[:12]
+    return (
+        f'post_card:{post.pk}:{post.updated.timestamp()}:'
+        f'{int(show_author)}{int(show_group)}:{names}'
+    )
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts, show_group: bool = True) -> list:
+    """
+    Return the rendered cards of the posts.
+
+    The cards are fetched from the cache with one get_many call;
+    only the missing ones are rendered, with their image variants
+    prefetched in one query, and stored with set_many.
+    The author line is hidden on the author's profile.
+
+    """
+    show_author = not context.get('author')
+    posts = list(posts)
+    keys = [card_cache_key(post, show_author, show_group) for post in posts]
+    cards = cache.get_many(keys)
+    prefetch_related_objects(
+        [post for post, key in zip(posts, keys) if key not in cards],
+        'image_variants',
+    )
+    missing = {}
+    for post, key in zip(posts, keys):
+        if key not in cards:
+            missing[key] = render_to_string(CARD_TEMPLATE, {
+                'post': post,
+                'author': not show_author,
+                'post_group': post.group if show_group else None,
+            })
+    if missing:
+        cache.set_many(missing, settings.POST_CARD_CACHE_TIMEOUT)
+        cards.update(missing)
+    return [mark_safe(cards[key]) for key in keys]
@@ -1,17 +1,23 @@
+import hashlib
 from http import HTTPStatus
+from io import BytesIO, StringIO
 import shutil
 import tempfile
+from unittest import mock
 
 from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django.conf import settings
 from django.utils import timezone
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import transaction
+from PIL import Image
 
 from posts.forms import PostForm, CommentForm
 from posts.tests.factories import (PostFactory, GroupFactory,
                                    ObsceneWordFactory, UserFactory)
-from posts.models import Post, Comment
+from posts.models import Post, Comment, ThumbnailJob
 
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -61,6 +67,27 @@ class PostFormTests(TestCase):
         self.assertNotIn('id', form.fields)
         self.assertNotIn('author', form.fields)
 
+    def test_only_valid_forms_open_transactions(self):
+        """
+        Test that the create and edit pages open a transaction, which
+        takes the database write lock, only to save a valid form.
+
+        """
+        urls = (
+            reverse('posts:post_create'),
+            reverse('posts:post_edit', args=(PostFormTests.post.pk,)),
+        )
+        with mock.patch(
+            'posts.views.transaction', wraps=transaction,
+        ) as views_transaction:
+            for url in urls:
+                self.authorised_post_author.get(url)
+                self.authorised_post_author.post(url, {'text': ''})
+            views_transaction.atomic.assert_not_called()
+            for url in urls:
+                self.authorised_post_author.post(url, {'text': 'Новый'})
+        self.assertEqual(views_transaction.atomic.call_count, len(urls))
+
     def test_create_post_success(self):
         """
         Test that a valid PostForm form creates a new post
@@ -455,3 +482,162 @@ class CommentFormTests(TestCase):
                 post=post,
             ).exists()
         )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPipelineTests(TestCase):
+    """Test suite for the background thumbnails of the post images."""
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def upload(self, name):
+        content = BytesIO()
+        Image.new('RGB', (40, 20), 'red').save(content, 'PNG')
+        return SimpleUploadedFile(
+            name=name, content=content.getvalue(), content_type='image/png',
+        )
+
+    def test_thumbnail_is_made_by_the_worker(self):
+        """
+        Test that a new image is queued and shown as a placeholder
+        until the worker has made its thumbnail.
+
+        """
+        self.client.post(
+            reverse('posts:post_create'),
+            data={'text': 'С картинкой', 'image': self.upload('pic.png')},
+        )
+        post = Post.objects.get(text='С картинкой')
+        self.assertFalse(post.thumbnail)
+        self.assertTrue(ThumbnailJob.objects.filter(post=post).exists())
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.pk,))
+        )
+        self.assertContains(response, 'thumbnail-placeholder.svg')
+
+        call_command(
+            'process_thumbnails', '--once', '--workers', '1',
+            stdout=StringIO(),
+        )
+        post.refresh_from_db()
+        self.assertFalse(ThumbnailJob.objects.exists())
+        with Image.open(post.thumbnail.path) as thumbnail:
+            self.assertEqual(thumbnail.size, (960, 480))
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.pk,))
+        )
+        self.assertContains(response, post.thumbnail.url)
+        self.assertContains(response, 'width="960" height="480"')
+
+        self.client.post(
+            reverse('posts:post_edit', args=(post.pk,)),
+            data={'text': 'С картинкой', 'image': self.upload('new.png')},
+        )
+        post.refresh_from_db()
+        self.assertFalse(post.thumbnail)
+        self.assertEqual(
+            ThumbnailJob.objects.get(post=post).image, post.image.name,
+        )
+
+    def test_responsive_variants_are_offered(self):
+        """
+        Test that the worker makes every width in every format and that
+        the page offers them in a srcset, the WebP ones first.
+
+        """
+        post = PostFactory(image=self.upload('wide.png'))
+        ThumbnailJob.objects.enqueue(post)
+        call_command(
+            'process_thumbnails', '--once', '--workers', '1',
+            stdout=StringIO(),
+        )
+        variants = post.image_variants.all()
+        self.assertEqual(
+            {(v.format, v.width) for v in variants},
+            {
+                (image_format, width)
+                for image_format in settings.POST_IMAGE_VARIANT_FORMATS
+                for width in settings.POST_IMAGE_VARIANT_WIDTHS
+            },
+        )
+        for variant in variants:
+            with Image.open(variant.image.path) as image:
+                self.assertEqual(image.format, variant.format.upper())
+                self.assertEqual(image.size, (variant.width, variant.height))
+
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.pk,))
+        )
+        content = response.content.decode()
+        small = post.image_variants.get(format='webp', width=320)
+        self.assertIn(f'{small.image.url} 320w', content)
+        self.assertLess(
+            content.index('type="image/webp"'),
+            content.index('type="image/jpeg"'),
+        )
+
+    def test_image_metadata_is_stored(self):
+        """
+        Test that the geometry, size and digest of an upload are stored
+        on save and that the backfill fills them for older posts.
+
+        """
+        upload = self.upload('meta.png')
+        content = upload.read()
+        post = PostFactory(image=upload)
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (40, 20))
+        self.assertEqual(post.image_size, len(content))
+        self.assertEqual(post.image_hash, hashlib.sha256(content).hexdigest())
+
+        missing = PostFactory(image='posts/missing.png')
+        self.assertIsNone(missing.image_size)
+        Post.objects.filter(pk=post.pk).update(
+            image_width=None, image_height=None, image_size=None,
+            image_hash='',
+        )
+        call_command(
+            'backfill_image_metadata', stdout=StringIO(), stderr=StringIO(),
+        )
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (40, 20))
+        self.assertEqual(post.image_hash, hashlib.sha256(content).hexdigest())
+
+    @override_settings(POST_THUMBNAIL_MAX_HEIGHT=600)
+    def test_thumbnail_size_follows_image_geometry(self):
+        """
+        Test that the thumbnail keeps the stored proportions of the
+        image up to the maximum height, and the default size is used
+        for the images of unknown geometry.
+
+        """
+        width = settings.POST_THUMBNAIL_SIZE[0]
+        sizes = (
+            ((40, 20), (width, width // 2)),
+            ((20, 40), (width, 600)),
+            ((None, None), settings.POST_THUMBNAIL_SIZE),
+        )
+        for (image_width, image_height), size in sizes:
+            with self.subTest(image_size=(image_width, image_height)):
+                post = Post(image_width=image_width, image_height=image_height)
+                self.assertEqual(post.thumbnail_size(), size)
+
+    def test_failed_job_is_retried_limited_times(self):
+        """Test that a job with a missing image is given up eventually."""
+        post = PostFactory(image='posts/missing.png')
+        ThumbnailJob.objects.enqueue(post)
+        call_command(
+            'process_thumbnails', '--once', '--workers', '1',
+            stdout=StringIO(), stderr=StringIO(),
+        )
+        job = ThumbnailJob.objects.get(post=post)
+        self.assertEqual(job.attempts, 3)
+        self.assertIn('FileNotFoundError', job.error)
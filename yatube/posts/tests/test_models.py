@@ -1,10 +1,22 @@
+from io import StringIO
+from unittest import mock
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
+from django.urls import reverse
 
 from posts.tests.factories import (GroupFactory, PostFactory, CommentFactory,
                                    UserFactory, FollowFactory)
+from posts.counters import (ALL_POSTS, PostCountProvider, author_scope,
+                            group_scope, hashtag_scope)
+from core.models import ObsceneWord
+from core.utility.censorship import RECENSOR_LOCK
+from posts.models import (Follow, Post, PostCounter, PostHashtag,
+                          RecensorProgress, Timeline, UserStats)
 
 
 User = get_user_model()
@@ -182,3 +194,365 @@ class FollowModelTests(TestCase):
                 user=FollowModelTests.user,
                 author=FollowModelTests.user,
             )
+
+
+class TimelineModelTests(TestCase):
+    """Test suite for the Timeline model."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = UserFactory()
+        cls.author = UserFactory()
+        cls.posts = PostFactory.create_batch(
+            size=3, author=cls.author, image=None,
+        )
+
+    def test_follow_backfills_timeline(self):
+        """Test that following an author adds the author's posts."""
+        FollowFactory(user=TimelineModelTests.user,
+                      author=TimelineModelTests.author)
+        self.assertEqual(
+            set(Timeline.objects.filter(
+                user=TimelineModelTests.user,
+            ).values_list('post', flat=True)),
+            {post.pk for post in TimelineModelTests.posts},
+        )
+
+    def test_new_post_fans_out_to_followers(self):
+        """Test that a new post is added to the followers' timelines."""
+        FollowFactory(user=TimelineModelTests.user,
+                      author=TimelineModelTests.author)
+        new_post = PostFactory(author=TimelineModelTests.author, image=None)
+        entry = Timeline.objects.get(
+            user=TimelineModelTests.user, post=new_post,
+        )
+        self.assertEqual(entry.pub_date, new_post.pub_date)
+
+    def test_unfollow_prunes_timeline(self):
+        """Test that unfollowing an author removes the author's posts."""
+        FollowFactory(user=TimelineModelTests.user,
+                      author=TimelineModelTests.author)
+        Follow.objects.filter(
+            user=TimelineModelTests.user,
+            author=TimelineModelTests.author,
+        ).delete()
+        self.assertFalse(
+            Timeline.objects.filter(user=TimelineModelTests.user).exists()
+        )
+
+
+class PostCounterTests(TestCase):
+    """Test suite for the PostCounter model and the count provider."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = GroupFactory()
+        cls.author = UserFactory()
+        PostFactory.create_batch(
+            size=3, author=cls.author, group=cls.group, image=None,
+        )
+        cls.scopes = (
+            ALL_POSTS,
+            group_scope(cls.group.pk),
+            author_scope(cls.author.pk),
+            hashtag_scope('Python'),
+        )
+
+    def seed_counters(self):
+        for scope in PostCounterTests.scopes:
+            PostCountProvider(scope, Post.objects.none()).count()
+
+    def counter_values(self):
+        return [
+            PostCounter.objects.get(scope=scope).value
+            for scope in PostCounterTests.scopes
+        ]
+
+    def test_missing_counter_is_seeded(self):
+        """Test that a missing counter is counted once and stored."""
+        provider = PostCountProvider(ALL_POSTS, Post.objects.all())
+        self.assertEqual(provider.count(), 3)
+        self.assertFalse(provider.approximate)
+        self.assertEqual(PostCounter.objects.get(scope=ALL_POSTS).value, 3)
+
+    def test_counters_follow_post_writes(self):
+        """Test that post creation, update and deletion move the counters."""
+        self.seed_counters()
+        post = PostFactory(
+            author=PostCounterTests.author,
+            group=PostCounterTests.group,
+            text='Пост про #python',
+            image=None,
+        )
+        self.assertEqual(self.counter_values(), [1, 1, 1, 1])
+
+        post.group = None
+        post.text = 'Пост без хэштегов'
+        post.save()
+        self.assertEqual(self.counter_values(), [1, 0, 1, 0])
+
+        post.delete()
+        self.assertEqual(self.counter_values(), [0, 0, 0, 0])
+
+    @override_settings(POST_COUNT_EXACT_LIMIT=2)
+    def test_large_scope_count_is_approximate(self):
+        """Test that scopes over the limit get an approximate count."""
+        provider = PostCountProvider(
+            author_scope(PostCounterTests.author.pk), Post.objects.all(),
+        )
+        self.assertEqual(provider.count(), 2)
+        self.assertTrue(provider.approximate)
+        self.assertFalse(
+            PostCounter.objects.filter(scope=provider.scope).exists()
+        )
+
+    def test_counter_seeded_meanwhile_is_not_counted_again(self):
+        """
+        Test that a counter seeded by another request after the first
+        lookup is read in the seeding transaction instead of counting.
+
+        """
+        queryset = mock.Mock()
+        provider = PostCountProvider(ALL_POSTS, queryset)
+        with mock.patch.object(
+            provider, '_stored_count', side_effect=[None, 7],
+        ):
+            self.assertEqual(provider.count(), 7)
+        queryset.order_by.assert_not_called()
+        self.assertFalse(provider.approximate)
+        self.assertFalse(PostCounter.objects.filter(scope=ALL_POSTS).exists())
+
+
+class UserStatsModelTests(TestCase):
+    """Test suite for the UserStats model."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = UserFactory()
+        cls.author = UserFactory()
+
+    def get_stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_new_user_gets_stats(self):
+        """Test that a new user starts with zero counters."""
+        stats = self.get_stats(UserStatsModelTests.user)
+        self.assertEqual(
+            (stats.posts_count, stats.followers_count, stats.following_count),
+            (0, 0, 0),
+        )
+
+    def test_posts_count_follows_post_writes(self):
+        """Test that creating and deleting posts updates posts_count."""
+        author = UserStatsModelTests.author
+        posts = PostFactory.create_batch(size=2, author=author, image=None)
+        self.assertEqual(self.get_stats(author).posts_count, 2)
+
+        posts[0].delete()
+        self.assertEqual(self.get_stats(author).posts_count, 1)
+
+    def test_follow_counts_follow_subscriptions(self):
+        """Test that following and unfollowing update both users' stats."""
+        user = UserStatsModelTests.user
+        author = UserStatsModelTests.author
+        FollowFactory(user=user, author=author)
+        self.assertEqual(self.get_stats(author).followers_count, 1)
+        self.assertEqual(self.get_stats(user).following_count, 1)
+
+        Follow.objects.filter(user=user, author=author).delete()
+        self.assertEqual(self.get_stats(author).followers_count, 0)
+        self.assertEqual(self.get_stats(user).following_count, 0)
+
+
+class HashtagModelTests(TestCase):
+    """Test suite for the Hashtag and PostHashtag models."""
+
+    def post_hashtags(self, post):
+        return set(post.hashtags.values_list('name', flat=True))
+
+    def test_saved_post_hashtags_are_indexed(self):
+        """Test that saving a post indexes its hashtags in lowercase."""
+        post = PostFactory(text='Про #Python и #django', image=None)
+        self.assertEqual(self.post_hashtags(post), {'python', 'django'})
+        self.assertEqual(
+            set(post.post_hashtags.values_list('pub_date', flat=True)),
+            {post.pub_date},
+        )
+
+        post.text = 'Только #django'
+        post.save()
+        self.assertEqual(self.post_hashtags(post), {'django'})
+
+    def test_backfill_hashtags_command(self):
+        """Test that the command indexes the hashtags of existing posts."""
+        post = PostFactory(text='Про #Python', image=None)
+        PostHashtag.objects.all().delete()
+        call_command('backfill_hashtags', stdout=StringIO())
+        self.assertEqual(self.post_hashtags(post), {'python'})
+
+
+class RenderedTextTests(TestCase):
+    """Test suite for the HTML rendered from the raw texts."""
+
+    def test_text_html_is_escaped_and_links_hashtags(self):
+        """
+        Test that the raw text is kept and its HTML is escaped
+        with linked hashtags.
+
+        """
+        post = PostFactory(text='<b>Про</b> #Python', image=None)
+        comment = CommentFactory(post=post, text='Да, #Python & <i>')
+        self.assertEqual(post.text, '<b>Про</b> #Python')
+        self.assertEqual(
+            post.text_html,
+            '&lt;b&gt;Про&lt;/b&gt; '
+            '<a href="/hashtag/Python/">#Python</a>',
+        )
+        self.assertEqual(
+            comment.text_html,
+            'Да, <a href="/hashtag/Python/">#Python</a> &amp; &lt;i&gt;',
+        )
+
+    def test_escaped_characters_are_not_hashtags(self):
+        """
+        Test that the entities of escaped apostrophes and quotes
+        are not linked as hashtags.
+
+        """
+        post = PostFactory(text='It\'s "#fine"', image=None)
+        self.assertEqual(
+            post.text_html,
+            'It&#39;s &quot;<a href="/hashtag/fine/">#fine</a>&quot;',
+        )
+        self.assertEqual(post.excerpt, post.text_html)
+        self.assertEqual(
+            list(post.hashtags.values_list('name', flat=True)), ['fine'],
+        )
+
+    @override_settings(POST_EXCERPT_WORDS=2)
+    def test_excerpt_is_cut_by_words(self):
+        """Test that the excerpt keeps the first words of the HTML."""
+        post = PostFactory(text='#один два три', image=None)
+        self.assertEqual(
+            post.excerpt, '<a href="/hashtag/один/">#один</a> два…',
+        )
+
+
+class RecensorCommandTests(TestCase):
+    """Test suite for the recensor management command."""
+
+    def recensor(self, *args):
+        call_command('recensor', '--workers', '1', *args, stdout=StringIO())
+
+    def test_existing_texts_are_censored(self):
+        """
+        Test that the command censors posts and comments with the new
+        words and updates the rendered text and the hashtag index.
+
+        """
+        grawlix = settings.GRAWLIX
+        post = PostFactory(text='Чай #утро', image=None)
+        comment = CommentFactory(post=post, text='Утром пью чай')
+        ObsceneWord.objects.create(word='утро')
+
+        self.recensor()
+        post.refresh_from_db()
+        comment.refresh_from_db()
+        self.assertEqual(post.text, f'Чай #{grawlix}')
+        self.assertEqual(post.text_html, f'Чай #{grawlix}')
+        self.assertEqual(comment.text, f'{grawlix}м пью чай')
+        self.assertFalse(post.hashtags.exists())
+
+        ObsceneWord.objects.create(word='чай')
+        self.recensor()
+        post.refresh_from_db()
+        self.assertEqual(post.text, f'{grawlix} #{grawlix}')
+
+    def test_counters_and_cached_pages_are_updated(self):
+        """
+        Test that the hashtag counters follow the censored texts and
+        the cached pages showing them are expired.
+
+        """
+        post = PostFactory(text='Чай #утро', image=None)
+        scope = hashtag_scope('утро')
+        PostCountProvider(scope, Post.objects.all()).count()
+        self.assertEqual(PostCounter.objects.get(scope=scope).value, 1)
+        cache.clear()
+        self.assertContains(self.client.get(reverse('posts:index')), '#утро')
+        ObsceneWord.objects.create(word='утро')
+
+        self.recensor()
+        self.assertEqual(PostCounter.objects.get(scope=scope).value, 0)
+        for url in (reverse('posts:index'),
+                    reverse('posts:post_detail', args=(post.pk,))):
+            with self.subTest(url=url):
+                self.assertNotContains(self.client.get(url), '#утро')
+
+    def test_one_run_at_a_time(self):
+        """
+        Test that the command refuses to start while another run holds
+        the lock and releases the lock when it is done.
+
+        """
+        post = PostFactory(text='чай', image=None)
+        ObsceneWord.objects.create(word='чай')
+        cache.set(RECENSOR_LOCK, 'other run')
+        with self.assertRaises(CommandError):
+            self.recensor()
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'чай')
+
+        cache.delete(RECENSOR_LOCK)
+        self.recensor()
+        post.refresh_from_db()
+        self.assertEqual(post.text, settings.GRAWLIX)
+        self.assertIsNone(cache.get(RECENSOR_LOCK))
+
+    def test_admin_action_does_not_start_second_run(self):
+        """
+        Test that the admin action hands its lock to the command and
+        warns the admin instead of starting a run while one is going.
+
+        """
+        self.addCleanup(cache.delete, RECENSOR_LOCK)
+        word = ObsceneWord.objects.create(word='чай')
+        self.client.force_login(
+            UserFactory(is_staff=True, is_superuser=True)
+        )
+        data = {'action': 'recensor_texts', '_selected_action': [word.pk]}
+        url = reverse('admin:core_obsceneword_changelist')
+        with mock.patch('core.admin.subprocess.Popen') as popen:
+            self.client.post(url, data)
+            response = self.client.post(url, data, follow=True)
+        popen.assert_called_once()
+        command = popen.call_args[0][0]
+        self.assertEqual(command[-1], cache.get(RECENSOR_LOCK))
+        self.assertEqual(command[-2], '--lock-token')
+        self.assertContains(response, 'уже выполняется')
+
+    def test_command_resumes_after_checkpoint(self):
+        """
+        Test that only the rows after the saved checkpoint are censored
+        while the word list stays the same.
+
+        """
+        first, second = PostFactory.create_batch(2, text='чай', image=None)
+        ObsceneWord.objects.create(word='чай')
+        self.recensor()
+        progress = RecensorProgress.objects.get(model='posts.Post')
+        self.assertEqual(progress.last_pk, second.pk)
+
+        Post.objects.filter(pk=first.pk).update(text='чай')
+        progress.last_pk = first.pk
+        progress.save()
+        self.recensor()
+        first.refresh_from_db()
+        self.assertEqual(first.text, 'чай')
+
+        self.recensor('--restart')
+        first.refresh_from_db()
+        self.assertEqual(first.text, settings.GRAWLIX)
@@ -0,0 +1,84 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.tests.factories import (CommentFactory, FollowFactory,
+                                   GroupFactory, PostFactory, UserFactory)
+
+# A table read row by row instead of through an index; SQLite before
+# 3.36 names the table after a TABLE keyword.
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?(?!subquery|CONSTANT ROW)\S+$')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+class QueryPlanTests(TestCase):
+    """
+    Test suite checking with EXPLAIN QUERY PLAN that the list views
+    read their rows through the indexes, in the index order.
+
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = UserFactory()
+        cls.reader = UserFactory()
+        cls.group = GroupFactory()
+        cls.posts = PostFactory.create_batch(
+            size=15, author=cls.author, group=cls.group, image=None,
+            text='Пост с #тегом',
+        )
+        CommentFactory.create_batch(
+            size=3, post=cls.posts[0], author=cls.reader,
+        )
+        FollowFactory(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(QueryPlanTests.reader)
+        cache.clear()
+
+    def urls(self) -> list:
+        return [
+            reverse('posts:index'),
+            reverse('posts:group_posts', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:post_detail', args=(self.posts[0].pk,)),
+            reverse('posts:follow_index'),
+            reverse('posts:hashtag', args=('тегом',)),
+        ]
+
+    def assertIndexedPlans(self, url: str) -> None:
+        """Assert that no query of the page scans a table or sorts."""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+            page_obj = response.context.get('page_obj')
+            if getattr(page_obj, 'next_cursor', None):
+                self.client.get(url, {'cursor': page_obj.next_cursor})
+            elif page_obj is not None and page_obj.has_next():
+                self.client.get(url, {'page': 2})
+        for query in context.captured_queries:
+            if not query['sql'].startswith('SELECT'):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                plan = [row[-1] for row in cursor.fetchall()]
+            for step in plan:
+                with self.subTest(url=url, sql=query['sql'], step=step):
+                    self.assertIsNone(FULL_SCAN.match(step))
+                    self.assertNotIn(TEMP_SORT, step)
+
+    def test_page_number_queries_use_indexes(self):
+        """Test the list pages paginated by page numbers."""
+        for url in self.urls():
+            self.assertIndexedPlans(url)
+
+    @override_settings(CURSOR_PAGINATION=True)
+    def test_cursor_queries_use_indexes(self):
+        """Test the list pages paginated by cursors."""
+        for url in self.urls():
+            self.assertIndexedPlans(url)
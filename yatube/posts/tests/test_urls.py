@@ -22,6 +22,7 @@ class PostURLTests(TestCase):
             f'/group/{cls.post.group.slug}/': 'posts/group_list.html',
             f'/profile/{cls.other_user.username}/': 'posts/profile.html',
             f'/posts/{cls.post.pk}/': 'posts/post_detail.html',
+            '/search/?q=пост': 'posts/search.html',
         }
 
         cls.private_url_template = {
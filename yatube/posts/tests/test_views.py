@@ -1,18 +1,32 @@
+import base64
+from http import HTTPStatus
+from io import StringIO
+import json
 from random import randrange
 import re
 import shutil
 import tempfile
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase, Client, override_settings
+from django.test import (TestCase, TransactionTestCase, Client,
+                         override_settings)
 from django.urls import reverse
 from django.conf import settings
 from django import forms
 from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from posts.tests.factories import (PostFactory, UserFactory, GroupFactory,
                                    CommentFactory, FollowFactory)
-from posts.models import Post, Follow
+from core.db.routers import PIN_COOKIE
+from core.templatetags.page_cache import FRAGMENT_KEY
+from core.utility.cache import LOCK_KEY, get_generations
+from posts.counters import ALL_POSTS
+from posts.models import Post, PostCounter, Follow
+from posts.page_cache import ALL_POSTS_PAGES, author_pages, post_page
+from posts.templatetags.post_cards import card_cache_key
 
 User = get_user_model()
 
@@ -238,6 +252,44 @@ class PostPagesTests(TestCase):
             ):
                 self.assertEqual(actual_value, expected_value)
 
+    def test_profile_header_runs_no_aggregate_queries(self):
+        """
+        Test that the profile and post_detail pages take the author's
+        numbers from the denormalized stats without COUNT queries.
+
+        """
+        author = PostPagesTests.post.author
+        reverse_names = (
+            reverse('posts:profile', kwargs={'username': author.username}),
+            reverse(
+                'posts:post_detail',
+                kwargs={'post_id': PostPagesTests.post.pk},
+            ),
+        )
+        for reverse_name in reverse_names:
+            with self.subTest(reverse_name=reverse_name):
+                self.guest_client.get(reverse_name)
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.guest_client.get(reverse_name)
+                self.assertContains(response, author.stats.posts_count)
+                self.assertFalse(any(
+                    'COUNT(' in query['sql'] for query in queries
+                ))
+
+    def test_hashtag_page_matches_hashtags_exactly(self):
+        """
+        Test that the hashtag page shows the posts with the hashtag
+        in any case and not the posts with longer hashtags.
+
+        """
+        tagged_post = PostFactory(text='Пост про #Py', image=None)
+        PostFactory(text='Пост про #python', image=None)
+
+        response = self.guest_client.get(
+            reverse('posts:hashtag', kwargs={'hashtag': 'py'})
+        )
+        self.assertEqual(list(response.context['page_obj']), [tagged_post])
+
     def test_post_create_update_pages_context(self):
         """
         Test that the HTML-template for the post_edit and post_create pages
@@ -444,6 +496,143 @@ class PostPagesTests(TestCase):
         self.assertNotIn(user, (obj.author for obj in user.follower.all()))
 
 
+class SearchViewsTests(TestCase):
+    """Test suite for the full-text search."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.post = PostFactory(text='Читаю книги по вечерам', image=None)
+        cls.commented_post = PostFactory(text='Мой отпуск', image=None)
+        CommentFactory(post=cls.commented_post, text='Какая хорошая книга!')
+        cls.other_post = PostFactory(text='Смотрю кино', image=None)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def search(self, query):
+        response = self.guest_client.get(reverse('posts:search'), {'q': query})
+        return list(response.context['page_obj'])
+
+    def test_search_matches_word_forms_in_posts_and_comments(self):
+        """
+        Test that the search finds other forms of the query words
+        in both post texts and comments.
+
+        """
+        found = self.search('книгой')
+        self.assertCountEqual(
+            found,
+            [SearchViewsTests.post, SearchViewsTests.commented_post],
+        )
+        self.assertNotIn(SearchViewsTests.other_post, found)
+
+    def test_search_follows_post_writes(self):
+        """Test that edited and deleted posts leave the search results."""
+        post = PostFactory(text='Изучаю астрономию', image=None)
+        self.assertEqual(self.search('астрономия'), [post])
+
+        post.text = 'Изучаю химию'
+        post.save()
+        self.assertEqual(self.search('астрономия'), [])
+
+        post.delete()
+        self.assertEqual(self.search('химия'), [])
+
+    def test_admin_search_uses_search_index(self):
+        """Test that the admin changelist search finds word forms."""
+        admin = UserFactory(is_staff=True, is_superuser=True)
+        self.guest_client.force_login(admin)
+        response = self.guest_client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'книгам'},
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list),
+            [SearchViewsTests.post],
+        )
+
+
+class PostCardCacheTests(TestCase):
+    """Test suite for the cached post cards."""
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.group = GroupFactory()
+        self.post = PostFactory(
+            text='Первая версия', group=self.group, image=None,
+        )
+        self.group_url = reverse('posts:group_posts', args=(self.group.slug,))
+
+    def test_card_is_cached_until_post_is_updated(self):
+        """
+        Test that a card is served from the cache until the post
+        is saved again.
+
+        """
+        self.assertContains(
+            self.guest_client.get(self.group_url), 'Первая версия',
+        )
+        Post.objects.filter(pk=self.post.pk).update(text_html='Вторая')
+        self.assertContains(
+            self.guest_client.get(self.group_url), 'Первая версия',
+        )
+
+        self.post.text = 'Вторая версия'
+        self.post.save()
+        self.assertContains(
+            self.guest_client.get(self.group_url), 'Вторая версия',
+        )
+
+    def test_card_is_rendered_again_for_new_names(self):
+        """
+        Test that a card is not reused once the author or the group
+        shown on it change, which does not update the post.
+
+        """
+        keys = {card_cache_key(self.post, True, True)}
+        author = self.post.author
+        author.first_name = 'Новое имя'
+        author.save()
+        keys.add(card_cache_key(self.post, True, True))
+        self.assertEqual(
+            card_cache_key(self.post, False, True),
+            card_cache_key(Post.objects.get(pk=self.post.pk), False, True),
+        )
+
+        self.assertContains(
+            self.guest_client.get(reverse('posts:index')), self.group_url,
+        )
+        self.group.slug = 'new-slug'
+        self.group.save()
+        self.post.refresh_from_db()
+        keys.add(card_cache_key(self.post, True, True))
+        self.assertEqual(len(keys), 3)
+        self.assertContains(
+            self.guest_client.get(reverse('posts:index')),
+            reverse('posts:group_posts', args=('new-slug',)),
+        )
+
+    def test_card_is_shared_by_list_pages(self):
+        """
+        Test that a card rendered for one list page is reused
+        by another page with the same card variant.
+
+        """
+        hashtag_post = PostFactory(text='Общий пост #тег', image=None)
+        self.guest_client.get(
+            reverse('posts:hashtag', args=('тег',))
+        )
+        Post.objects.filter(pk=hashtag_post.pk).update(text_html='Другой')
+        self.assertContains(
+            self.guest_client.get(
+                reverse('posts:search'), {'q': 'общий'}
+            ),
+            'Общий пост',
+        )
+
+
 class PaginatorViewsTests(TestCase):
     """Test suite for the paginator."""
 
@@ -517,6 +706,91 @@ class PaginatorViewsTests(TestCase):
                 )
 
 
+@override_settings(CURSOR_PAGINATION=True)
+class CursorPaginatorViewsTests(TestCase):
+    """Test suite for the cursor (keyset) pagination mode."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.posts_num_on_page = settings.TOTAL_ON_PAGE
+        cls.extra_num = randrange(1, cls.posts_num_on_page)
+
+        cls.group = GroupFactory()
+        cls.user = UserFactory()
+        cls.author = UserFactory()
+        PostFactory.create_batch(
+            size=cls.posts_num_on_page + cls.extra_num,
+            group=cls.group,
+            author=cls.author,
+            image=None,
+        )
+        FollowFactory(user=cls.user, author=cls.author)
+
+        cls.reverse_names = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': cls.group.slug}),
+            reverse(
+                'posts:profile', kwargs={'username': cls.author.username}
+            ),
+            reverse('posts:follow_index'),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+        self.authorised_client = Client()
+        self.authorised_client.force_login(CursorPaginatorViewsTests.user)
+
+    def test_pages_follow_each_other(self):
+        """
+        Test that the next and previous cursors lead to the adjacent pages
+        without gaps or repeats.
+
+        """
+        expected = list(
+            Post.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True)
+        )
+        for reverse_name in CursorPaginatorViewsTests.reverse_names:
+            with self.subTest(reverse_name=reverse_name):
+                first_page = self.authorised_client.get(
+                    reverse_name
+                ).context['page_obj']
+                self.assertFalse(first_page.has_previous())
+                self.assertTrue(first_page.has_next())
+
+                second_page = self.authorised_client.get(
+                    reverse_name, {'cursor': first_page.next_cursor},
+                ).context['page_obj']
+                self.assertEqual(
+                    len(second_page), CursorPaginatorViewsTests.extra_num,
+                )
+                self.assertFalse(second_page.has_next())
+                self.assertEqual(
+                    [post.pk for post in first_page]
+                    + [post.pk for post in second_page],
+                    expected,
+                )
+
+                previous_page = self.authorised_client.get(
+                    reverse_name, {'cursor': second_page.previous_cursor},
+                ).context['page_obj']
+                self.assertEqual(list(previous_page), list(first_page))
+                self.assertFalse(previous_page.has_previous())
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Test that a malformed cursor falls back to the first page."""
+        response = self.authorised_client.get(
+            reverse('posts:index'), {'cursor': 'not-a-cursor'},
+        )
+        page_obj = response.context['page_obj']
+        self.assertEqual(
+            len(page_obj), CursorPaginatorViewsTests.posts_num_on_page,
+        )
+        self.assertFalse(page_obj.has_previous())
+
+
 class CacheIndexPageTests(TestCase):
     """Test suite for the index page cache."""
 
@@ -546,22 +820,114 @@ class CacheIndexPageTests(TestCase):
         super().tearDownClass()
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
-    def test_deleted_data_remain_cached(self):
+    def test_page_is_cached_until_posts_change(self):
         """
-        Test that after deleting a post, it is saved in cache
-        until cache has been cleared.
+        Test that the index page is served from the cache until
+        a post is written, and is rendered again right after that.
 
         """
         first_response = self.guest_client.get(reverse('posts:index'))
-        Post.objects.get(pk=self.post_to_be_deleted.pk).delete()
-
+        Post.objects.filter(pk=self.post_to_be_deleted.pk).update(
+            text_html='CHANGED BEHIND THE CACHE',
+        )
         second_response = self.guest_client.get(reverse('posts:index'))
-        cache.clear()
+        self.assertEqual(first_response.content, second_response.content)
 
+        Post.objects.get(pk=self.post_to_be_deleted.pk).delete()
         third_response = self.guest_client.get(reverse('posts:index'))
-
-        self.assertEqual(first_response.content, second_response.content)
         self.assertNotEqual(first_response.content, third_response.content)
+        self.assertNotContains(third_response, 'TO BE DELETED')
+
+    def test_anonymous_page_is_served_before_session(self):
+        """
+        Test that visitors without a session share one cached response
+        served without any database queries, and that logged in users
+        do not get it.
+
+        """
+        self.guest_client.get(reverse('posts:index'))
+        with self.assertNumQueries(0):
+            response = Client().get(reverse('posts:index'))
+        self.assertEqual(response.status_code, 200)
+
+        authorised_response = self.authorised_client.get(
+            reverse('posts:index')
+        )
+        self.assertNotEqual(response.content, authorised_response.content)
+        self.assertIsNotNone(authorised_response.context)
+
+    def test_logged_in_users_share_page_body(self):
+        """
+        Test that the list body is shared by the logged in users
+        while their header is rendered for each of them.
+
+        """
+        self.authorised_client.get(reverse('posts:index'))
+        Post.objects.filter(pk=self.post_to_be_deleted.pk).update(
+            text_html='CHANGED BEHIND THE CACHE',
+        )
+        other_user = UserFactory()
+        other_client = Client()
+        other_client.force_login(other_user)
+        response = other_client.get(reverse('posts:index'))
+        self.assertContains(response, 'TO BE DELETED')
+        self.assertContains(response, other_user.username)
+
+    def test_list_pages_are_expired_by_their_scopes(self):
+        """
+        Test that saving a post expires the cached group, profile
+        and hashtag pages showing it, but not the unrelated ones.
+
+        """
+        other_group = GroupFactory()
+        urls = (
+            reverse('posts:group_posts', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+            reverse('posts:hashtag', args=('новость',)),
+        )
+        other_url = reverse('posts:group_posts', args=(other_group.slug,))
+        for url in (*urls, other_url):
+            self.guest_client.get(url)
+
+        PostFactory(
+            text='Свежий #новость', author=self.user, group=self.group,
+            image=None,
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.guest_client.get(url), 'Свежий')
+        with self.assertNumQueries(0):
+            self.guest_client.get(other_url)
+
+    def test_group_changes_expire_pages_of_its_posts(self):
+        """
+        Test that a new slug or the deletion of a group expires
+        the pages showing its posts, detached from it by the database.
+
+        """
+        group = GroupFactory(slug='old-slug')
+        author = UserFactory()
+        post = PostFactory(author=author, group=group, image=None)
+        url = reverse('posts:post_detail', args=(post.pk,))
+        scopes = (
+            ALL_POSTS_PAGES, author_pages(author.username), post_page(post.pk),
+        )
+        self.assertContains(self.guest_client.get(url), 'old-slug')
+
+        generations = get_generations(scopes)
+        group.slug = 'new-slug'
+        group.save()
+        self.assertContains(self.guest_client.get(url), 'new-slug')
+        for scope, generation in get_generations(scopes).items():
+            with self.subTest(scope=scope):
+                self.assertNotEqual(generation, generations[scope])
+
+        generations = get_generations(scopes)
+        group.delete()
+        self.assertNotContains(self.guest_client.get(url), 'new-slug')
+        for scope, generation in get_generations(scopes).items():
+            with self.subTest(scope=scope):
+                self.assertNotEqual(generation, generations[scope])
 
     def test_different_pages_return_different_cached_content(self):
         """
@@ -599,3 +965,225 @@ class CacheIndexPageTests(TestCase):
             unauthorised_response.content,
             authorised_response.content,
         )
+
+
+class ConditionalGetTests(TestCase):
+    """Test suite for the ETags of the cached pages."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = UserFactory()
+        cls.group = GroupFactory()
+        cls.post = PostFactory(author=cls.user, group=cls.group, image=None)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorised_client = Client()
+        self.authorised_client.force_login(ConditionalGetTests.user)
+
+    def assertNotModifiedUntil(self, client, url, change):
+        """
+        Assert that the page is answered with 304 for its own ETag,
+        and with a new page after the change.
+
+        """
+        etag = client.get(url)['ETag']
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        change()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_pages_are_not_modified_until_posts_change(self):
+        """Test the index, group and profile pages of both kinds of users."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+        )
+        for client in (self.guest_client, self.authorised_client):
+            for url in urls:
+                with self.subTest(url=url):
+                    self.assertNotModifiedUntil(
+                        client, url, lambda: PostFactory(
+                            author=self.user, group=self.group, image=None,
+                        ),
+                    )
+
+    def test_post_page_is_not_modified_until_commented(self):
+        """Test that a comment or an edit changes the post page ETag."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        self.assertNotModifiedUntil(
+            self.authorised_client, url,
+            lambda: CommentFactory(post=self.post, author=self.user),
+        )
+        self.post.text = 'Изменённый текст'
+        self.assertNotModifiedUntil(self.guest_client, url, self.post.save)
+
+    def test_page_with_stale_fragment_has_no_etag(self):
+        """
+        Test that a page whose body is served from a previous version,
+        while another process renders the new one, gets no ETag.
+
+        """
+        url = reverse('posts:index')
+        lock_key = LOCK_KEY.format(
+            FRAGMENT_KEY.format(name='page_body', path=url)
+        )
+        cache.clear()
+        etag = self.authorised_client.get(url)['ETag']
+        PostFactory(author=self.user, image=None, text='Самый новый пост')
+        cache.add(lock_key, True)
+        self.addCleanup(cache.delete, lock_key)
+        response = self.authorised_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotContains(response, 'Самый новый пост')
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_users_get_their_own_etags(self):
+        """Test that a page seen anonymously is not reused after a login."""
+        url = reverse('posts:index')
+        etag = self.guest_client.get(url)['ETag']
+        response = self.authorised_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+
+@override_settings(REPLICA_DATABASES=('replica',))
+class ReplicaRoutingTests(TransactionTestCase):
+    """Test suite for the reads of the views from a replica."""
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = UserFactory()
+        self.post = PostFactory(author=self.user, image=None)
+        self.client = Client()
+        self.client.force_login(self.user)
+        call_command('sync_replicas', stdout=StringIO())
+
+    def test_read_views_use_the_replica(self):
+        """Test that a post is shown once the replica has been synced."""
+        post = PostFactory(author=self.user, image=None)
+        url = reverse('posts:post_detail', args=(post.pk,))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        call_command('sync_replicas', stdout=StringIO())
+        self.assertEqual(self.client.get(url).status_code, HTTPStatus.OK)
+
+    def test_post_counters_are_seeded_from_the_primary(self):
+        """
+        Test that a counter missing when a list page is read from
+        the replica is counted and stored on the primary.
+
+        """
+        PostFactory(author=self.user, image=None)
+        PostCounter.objects.all().delete()
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(PostCounter.objects.get(scope=ALL_POSTS).value, 2)
+        self.assertFalse(
+            PostCounter.objects.using('replica').filter(
+                scope=ALL_POSTS,
+            ).exists()
+        )
+
+    def test_writers_read_from_the_primary(self):
+        """Test that a new comment is shown at once to its author only."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        self.client.post(
+            reverse('posts:add_comment', args=(self.post.pk,)),
+            data={'text': 'Свежий комментарий'},
+        )
+        self.assertIn(PIN_COOKIE, self.client.cookies)
+        self.assertContains(self.client.get(url), 'Свежий комментарий')
+        self.assertNotContains(Client().get(url), 'Свежий комментарий')
+
+
+class CommentPaginationTests(TestCase):
+    """Test suite for the cursor pages of the post comments."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.post = PostFactory(image=None)
+        cls.comments = CommentFactory.create_batch(
+            size=settings.COMMENTS_ON_PAGE + 5, post=cls.post,
+        )
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+
+    def test_first_page_is_rendered_inline(self):
+        """Test that the post page shows the newest comments only."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,))
+        )
+        comments = response.context['comments']
+        self.assertEqual(
+            list(comments),
+            self.comments[::-1][:settings.COMMENTS_ON_PAGE],
+        )
+        self.assertTrue(comments.has_next())
+        self.assertContains(
+            response, reverse('posts:post_comments', args=(self.post.pk,)),
+        )
+
+    def test_later_pages_are_html_fragments(self):
+        """Test that the fragment endpoint returns the next comments."""
+        first = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,))
+        ).context['comments']
+        response = self.client.get(
+            reverse('posts:post_comments', args=(self.post.pk,)),
+            {'cursor': first.next_cursor},
+        )
+        self.assertTemplateUsed(response, 'includes/comment_list.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertEqual(
+            list(response.context['comments']), self.comments[4::-1],
+        )
+        self.assertNotContains(response, 'data-comments-more')
+
+    def test_oldest_first_order(self):
+        """Test that the comments can be read from the oldest one."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,)),
+            {'order': 'oldest'},
+        )
+        self.assertEqual(
+            list(response.context['comments']),
+            self.comments[:settings.COMMENTS_ON_PAGE],
+        )
+        self.assertContains(response, 'order=oldest&amp;cursor=')
+
+    def test_forged_cursor_returns_first_page(self):
+        """
+        Test that cursors with key values of the wrong type, out of range
+        or missing fall back to the first page instead of failing.
+
+        """
+        forged_values = (
+            ['n', 'not-a-date', 1],
+            ['n', '2022-01-01T00:00:00+00:00', 'not-a-pk'],
+            ['n', None, None],
+            ['n', [], {}],
+            ['n', '2022-01-01T00:00:00+00:00', 2 ** 64],
+        )
+        urls = (
+            reverse('posts:post_detail', args=(self.post.pk,)),
+            reverse('posts:post_comments', args=(self.post.pk,)),
+        )
+        for values in forged_values:
+            cursor = base64.urlsafe_b64encode(
+                json.dumps(values).encode()
+            ).decode()
+            for url in urls:
+                with self.subTest(url=url, values=values):
+                    response = self.client.get(url, {'cursor': cursor})
+                    self.assertEqual(response.status_code, HTTPStatus.OK)
+                    self.assertEqual(
+                        list(response.context['comments']),
+                        self.comments[::-1][:settings.COMMENTS_ON_PAGE],
+                    )
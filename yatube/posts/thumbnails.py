@@ -0,0 +1,70 @@
+import hashlib
+from pathlib import Path
+from typing import List, NamedTuple, Sequence, Tuple
+
+from PIL import Image, ImageOps
+
+THUMBNAIL_DIRECTORY = 'posts/thumbnails'
+# File extensions and Pillow save options of the variant formats.
+FORMATS = {
+    'webp': ('webp', {'format': 'WEBP', 'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', {'format': 'JPEG', 'quality': 85, 'optimize': True}),
+}
+
+
+class Variant(NamedTuple):
+    name: str
+    width: int
+    height: int
+    format: str
+
+
+def variant_name(post_id: int, image_name: str, width: int,
+                 image_format: str) -> str:
+    """Return the storage name of a variant of a post image."""
+    digest = hashlib.md5(image_name.encode()).hexdigest()[:8]
+    extension = FORMATS[image_format][0]
+    return f'{THUMBNAIL_DIRECTORY}/{post_id}-{digest}-{width}.{extension}'
+
+
+def image_variants(post_id: int, image_name: str, size: Tuple[int, int],
+                   widths: Sequence[int],
+                   formats: Sequence[str]) -> List[Variant]:
+    """
+    Return the variants to make of a post image: every format at
+    every width up to the thumbnail size, keeping its proportions.
+    The full size JPEG, the fallback for the browsers without srcset
+    support, is always included.
+
+    """
+    width, height = size
+    formats = [*formats, 'jpeg'] if 'jpeg' not in formats else formats
+    widths = sorted({w for w in widths if w < width} | {width})
+    return [
+        Variant(
+            variant_name(post_id, image_name, w, image_format),
+            w, round(w * height / width), image_format,
+        )
+        for image_format in formats
+        for w in widths
+    ]
+
+
+def make_variants(source: str, targets: Sequence[Tuple[str, int, int, str]],
+                  size: Tuple[int, int]) -> None:
+    """
+    Crop the center of the source image to the proportions of the size,
+    scale it (up, if needed) to the size and save it downscaled to each
+    of the (path, width, height, format) targets.
+
+    """
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        thumbnail = ImageOps.fit(image, size, Image.LANCZOS)
+    for path, width, height, image_format in targets:
+        if (width, height) == thumbnail.size:
+            variant = thumbnail
+        else:
+            variant = thumbnail.resize((width, height), Image.LANCZOS)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        variant.save(path, **FORMATS[image_format][1])
@@ -11,6 +11,11 @@ urlpatterns = [
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments',
+    ),
     path(
         'posts/<int:post_id>/comment/',
         views.add_comment,
@@ -28,4 +33,5 @@ urlpatterns = [
         name='profile_unfollow'
     ),
     path('hashtag/<str:hashtag>/', views.hashtag_posts, name='hashtag'),
+    path('search/', views.search_posts, name='search'),
 ]
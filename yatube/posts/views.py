@@ -2,18 +2,34 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, render, redirect
 from django.core.exceptions import PermissionDenied
-from django.views.decorators.vary import vary_on_cookie
-from django.views.decorators.cache import cache_page
-
-from core.utility.utils import get_page_obj, remove_hashtag_links
+from django.db import transaction
+from django.db.models import F
+from django.conf import settings
+from django.views.decorators.http import condition
+
+from core.db.routers import pin_primary, replica_reads
+from core.utility.cache import versioned_cache_page
+from core.utility.utils import get_page_obj
+from .counters import (ALL_POSTS, PostCountProvider, author_scope,
+                       group_scope, hashtag_scope)
 from .forms import PostForm, CommentForm
-from .models import Group, Post, Follow
+from .models import Group, Hashtag, Post, Follow, ThumbnailJob
+from .page_cache import (ALL_POSTS_PAGES, author_pages, group_pages,
+                         hashtag_pages, post_detail_etag)
+from .search import PostSearchResults
 
 User = get_user_model()
 
+COMMENT_ORDERINGS = {
+    'newest': ('-pub_date', '-pk'),
+    'oldest': ('pub_date', 'pk'),
+}
+
 
-@cache_page(20, key_prefix='index_page')
-@vary_on_cookie
+@replica_reads
+@versioned_cache_page(
+    settings.PAGE_CACHE_TIMEOUT, 'index_page', (ALL_POSTS_PAGES,),
+)
 def index(request):
     """
     Display the index page with posts (:model:`posts.Post` instances)
@@ -23,7 +39,11 @@ def index(request):
     template = 'posts/index.html'
 
     post_list = Post.objects.select_related('author', 'group').all()
-    page_obj = get_page_obj(request=request, obj=post_list)
+    page_obj = get_page_obj(
+        request=request,
+        obj=post_list,
+        count_provider=PostCountProvider(ALL_POSTS, post_list),
+    )
 
     context = {'page_obj': page_obj}
 
@@ -34,16 +54,32 @@ def index(request):
     )
 
 
+@replica_reads
+@versioned_cache_page(
+    settings.PAGE_CACHE_TIMEOUT, 'hashtag_page',
+    lambda hashtag: (hashtag_pages(hashtag),),
+)
 def hashtag_posts(request, hashtag):
     """
-    Display posts by hashtags.
+    Display posts by hashtags (exact, case-insensitive match)
+    using the hashtag index (:model:`posts.PostHashtag`).
 
     """
     template = 'posts/hashtag_index.html'
     post_list = Post.objects.select_related(
         'author', 'group'
-    ).filter(text__icontains=f'#{hashtag}').all()
-    page_obj = get_page_obj(request=request, obj=post_list)
+    ).filter(
+        post_hashtags__hashtag__name=Hashtag.normalize(hashtag),
+    ).annotate(
+        tag_date=F('post_hashtags__pub_date'),
+        tag_pk=F('post_hashtags__pk'),
+    ).order_by('-tag_date', '-tag_pk')
+    page_obj = get_page_obj(
+        request=request,
+        obj=post_list,
+        ordering=('-tag_date', '-tag_pk'),
+        count_provider=PostCountProvider(hashtag_scope(hashtag), post_list),
+    )
 
     return render(
         request=request,
@@ -55,6 +91,35 @@ def hashtag_posts(request, hashtag):
     )
 
 
+def search_posts(request):
+    """
+    Display posts whose text or comments contain all the words
+    of the query in any of their forms, best matches first.
+
+    """
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    page_obj = get_page_obj(
+        request=request,
+        obj=PostSearchResults(query),
+        cursor=False,
+    )
+
+    return render(
+        request=request,
+        template_name=template,
+        context={
+            'page_obj': page_obj,
+            'query': query,
+        },
+    )
+
+
+@replica_reads
+@versioned_cache_page(
+    settings.PAGE_CACHE_TIMEOUT, 'group_page',
+    lambda slug: (group_pages(slug),),
+)
 def group_posts(request, slug):
     """
     Display posts (:model:`posts.Post` instances) filtered
@@ -69,7 +134,11 @@ def group_posts(request, slug):
 
     group = get_object_or_404(Group, slug=slug)
     post_list = group.posts.select_related('author').all()
-    page_obj = get_page_obj(request=request, obj=post_list)
+    page_obj = get_page_obj(
+        request=request,
+        obj=post_list,
+        count_provider=PostCountProvider(group_scope(group.pk), post_list),
+    )
 
     context = {
         'group': group,
@@ -82,6 +151,11 @@ def group_posts(request, slug):
     )
 
 
+@replica_reads
+@versioned_cache_page(
+    settings.PAGE_CACHE_TIMEOUT, 'profile_page',
+    lambda username: (author_pages(username),),
+)
 def profile(request, username):
     """
     Display all posts (:model:`posts.Post` instances) filtered
@@ -92,9 +166,18 @@ def profile(request, username):
 
     """
     template = 'posts/profile.html'
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username,
+    )
     author_posts = author.posts.select_related('group').all()
-    page_obj = get_page_obj(request=request, obj=author_posts)
+    page_obj = get_page_obj(
+        request=request,
+        obj=author_posts,
+        count_provider=PostCountProvider(
+            author_scope(author.pk), author_posts,
+        ),
+    )
 
     following = request.user.is_authenticated and Follow.objects.filter(
         user=request.user, author=author).exists()
@@ -111,6 +194,8 @@ def profile(request, username):
     )
 
 
+@replica_reads
+@condition(etag_func=post_detail_etag)
 def post_detail(request, post_id):
     """
     Display page with information about a particular post.
@@ -122,15 +207,16 @@ def post_detail(request, post_id):
     template = 'posts/post_detail.html'
     form = CommentForm()
     post = get_object_or_404(
-        Post.objects.select_related('group', 'author'),
+        Post.objects.select_related('group', 'author__stats'),
         pk=post_id,
     )
-    comments = post.comments.select_related('author').all()
+    comments, order = get_comments_page(request, post)
 
     context = {
         'post': post,
         'form': form,
         'comments': comments,
+        'order': order,
     }
     return render(
         request=request,
@@ -139,7 +225,51 @@ def post_detail(request, post_id):
     )
 
 
+@replica_reads
+@condition(etag_func=post_detail_etag)
+def post_comments(request, post_id):
+    """
+    Return the HTML fragment of a later page of the post comments,
+    appended to the post page by the "more comments" button.
+
+    """
+    template = 'includes/comment_list.html'
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments, order = get_comments_page(request, post)
+
+    context = {
+        'post': post,
+        'comments': comments,
+        'order': order,
+    }
+    return render(
+        request=request,
+        template_name=template,
+        context=context,
+    )
+
+
+def get_comments_page(request, post):
+    """
+    Return the cursor page of the post comments selected by the request
+    and their order, the newest ones first unless `order` is "oldest".
+
+    """
+    order = request.GET.get('order')
+    if order not in COMMENT_ORDERINGS:
+        order = 'newest'
+    comments = get_page_obj(
+        request=request,
+        obj=post.comments.select_related('author'),
+        cursor=True,
+        ordering=COMMENT_ORDERINGS[order],
+        per_page=settings.COMMENTS_ON_PAGE,
+    )
+    return comments, order
+
+
 @login_required
+@pin_primary
 def post_create(request):
     """
     Create a new Post instance (:model:`posts.Post`) by an authorised user.
@@ -150,9 +280,12 @@ def post_create(request):
 
     form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
-        instance = form.save(commit=False)
-        instance.author = user
-        instance.save()
+        with transaction.atomic():
+            instance = form.save(commit=False)
+            instance.author = user
+            instance.save()
+            if instance.image:
+                ThumbnailJob.objects.enqueue(instance)
         return redirect(
             'posts:profile',
             username=user.username,
@@ -165,6 +298,7 @@ def post_create(request):
 
 
 @login_required
+@pin_primary
 def post_edit(request, post_id):
     """
     Update a particular Post instance (:model:`posts.Post`)
@@ -176,7 +310,6 @@ def post_edit(request, post_id):
         Post.objects.select_related('group', 'author'),
         pk=post_id
     )
-    post.text = remove_hashtag_links(post.text)
     if request.user != post.author:
         raise PermissionDenied()
 
@@ -186,7 +319,13 @@ def post_edit(request, post_id):
         instance=post
     )
     if form.is_valid():
-        post.save()
+        image_changed = 'image' in form.changed_data
+        with transaction.atomic():
+            if image_changed:
+                post.delete_image_variants()
+            post.save()
+            if image_changed:
+                ThumbnailJob.objects.enqueue(post)
         return redirect(
             'posts:post_detail',
             post_id=post_id,
@@ -200,6 +339,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@pin_primary
 def add_comment(request, post_id):
     """
     Add comments to posts by authoorised users.
@@ -212,7 +352,8 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
 
     return redirect(
         'posts:post_detail',
@@ -223,15 +364,25 @@ def add_comment(request, post_id):
 @login_required
 def follow_index(request):
     """
-    Display list with posts of the authors followed by the request user.
+    Display list with posts of the authors followed by the request user
+    read from the user's materialized timeline (:model:`posts.Timeline`).
 
     """
     current_user = request.user
     post_list = Post.objects.select_related(
         'author', 'group'
-    ).filter(author__following__user=request.user)
-
-    page_obj = get_page_obj(request=request, obj=post_list)
+    ).filter(
+        timeline_entries__user=current_user,
+    ).annotate(
+        feed_date=F('timeline_entries__pub_date'),
+        feed_pk=F('timeline_entries__pk'),
+    ).order_by('-feed_date', '-feed_pk')
+
+    page_obj = get_page_obj(
+        request=request,
+        obj=post_list,
+        ordering=('-feed_date', '-feed_pk'),
+    )
 
     context = {
         'page_obj': page_obj,
@@ -245,6 +396,7 @@ def follow_index(request):
 
 
 @login_required
+@pin_primary
 def profile_follow(request, username):
     """
     Add post author to the request user's subscriptions.
@@ -253,7 +405,8 @@ def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     user = request.user
     if user != author:
-        Follow.objects.get_or_create(user=request.user, author=author)
+        with transaction.atomic():
+            Follow.objects.get_or_create(user=request.user, author=author)
 
     return redirect(
         'posts:profile',
@@ -262,6 +415,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@pin_primary
 def profile_unfollow(request, username):
     """
     Remove post author from the request user's subscriptions.
@@ -272,7 +426,8 @@ def profile_unfollow(request, username):
         author=author,
     ).values_list('user', flat=True)
     if request.user.pk in author_followers:
-        Follow.objects.filter(user=request.user, author=author).delete()
+        with transaction.atomic():
+            Follow.objects.filter(user=request.user, author=author).delete()
 
     return redirect(
         'posts:profile',
@@ -0,0 +1,24 @@
+// Load the next page of comments in place of the "more comments" link;
+// without the script the link opens that page of the post instead.
+document.addEventListener('click', function (event) {
+  const link = event.target.closest('[data-comments-more]');
+  if (!link) {
+    return;
+  }
+  event.preventDefault();
+  link.classList.add('disabled');
+  fetch(link.dataset.fragment)
+    .then(function (response) {
+      if (!response.ok) {
+        throw new Error(response.statusText);
+      }
+      return response.text();
+    })
+    .then(function (html) {
+      link.insertAdjacentHTML('afterend', html);
+      link.remove();
+    })
+    .catch(function () {
+      window.location.href = link.href;
+    });
+});
@@ -1,8 +1,14 @@
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+
 SECRET_KEY = 'django-insecure-xu-h$k-@4nv2582fm%r606pq&5dxb3++up=-oir%0+=8_%ejj-'
 
 
@@ -33,6 +39,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.AnonymousPageCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -70,9 +77,34 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.db.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 60,
+    },
+}
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+# Aliases the read-only views read from (core.db.routers), e.g.
+# ('replica',); each is declared below as a local copy of the default
+# database, kept in sync by `manage.py sync_replicas`.
+REPLICA_DATABASES = ()
+# The replica routing tests read from a copy of their own.
+for alias in REPLICA_DATABASES or (('replica',) if TESTING else ()):
+    DATABASES[alias] = {
+        'ENGINE': 'core.db.sqlite3',
+        'NAME': os.path.join(BASE_DIR, f'{alias}.sqlite3'),
+        'CONN_MAX_AGE': 60,
     }
+# How long a user reads from the primary after writing.
+REPLICA_PIN_SECONDS = 30
+
+# Applied to every new SQLite connection by the core.db.sqlite3 backend.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
 }
 
 
@@ -91,9 +123,22 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# The tests clear the cache: they get their own one, removed on exit,
+# instead of the one shared with the running server.
+CACHE_DIR = tempfile.mkdtemp(prefix='yatube-cache-') if TESTING else BASE_DIR
+if TESTING:
+    atexit.register(shutil.rmtree, CACHE_DIR, ignore_errors=True)
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.backends.TieredCache',
+        'LOCATION': os.path.join(CACHE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'L1_MAX_BYTES': 16 * 1024 * 1024,
+            'L1_CHECK_INTERVAL': 0,
+            'MAX_ENTRIES': 100000,
+            'COMPRESS_MIN_BYTES': 1024,
+        },
     }
 }
 
@@ -118,6 +163,9 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 TOTAL_ON_PAGE = 10
+COMMENTS_ON_PAGE = 20
+CURSOR_PAGINATION = False
+POST_COUNT_EXACT_LIMIT = 10000
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -126,6 +174,17 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 GRAWLIX = '***'
+NORMAL_FORMS_CACHE_SIZE = 100000
 TEXT_STR_LIMIT = 15
+POST_EXCERPT_WORDS = 50
+POST_CARD_CACHE_TIMEOUT = 60 * 60
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+# The thumbnails keep the proportions of the images up to the maximum
+# height; the size is used as is for the images of unknown geometry.
+POST_THUMBNAIL_SIZE = (960, 339)
+POST_THUMBNAIL_MAX_HEIGHT = 960
+POST_IMAGE_VARIANT_WIDTHS = (320, 640, 960)
+POST_IMAGE_VARIANT_FORMATS = ('webp', 'jpeg')
+CACHE_STALE_TIMEOUT = 60 * 60
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'